@@ -1,13 +1,17 @@
+import time
+
 import streamlit as st
-import os
-import tempfile
-import json
-from parser import parse_document
-from translator import translate_segments
-from reconstructor import reconstruct_docx
+from jobs import JobManager, JobQueueFull
+
+POLL_SECONDS = 0.5
 
 st.set_page_config(page_title="IFRS Translation AI", layout="centered")
 
+@st.cache_resource
+def get_job_manager():
+    # One bounded pool per server process, shared by every browser session
+    return JobManager()
+
 st.title("📄 IFRS Document Translator")
 st.markdown("Upload a Word document (.docx) to translate it using AWS Bedrock (Claude).")
 
@@ -17,72 +21,54 @@ with st.sidebar:
     st.info("Ensure AWS Credentials are set in App Runner configuration.")
 
 uploaded_file = st.file_uploader("Choose a .docx file", type="docx")
+manager = get_job_manager()
 
 if uploaded_file is not None:
     st.success(f"File uploaded: {uploaded_file.name}")
-    
+
     if st.button("Start Translation"):
-        with st.spinner("Processing... Please wait."):
-            try:
-                tmp_paths = []
-                # Create temp files for processing
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_input:
-                    tmp_input.write(uploaded_file.getvalue())
-                    input_path = tmp_input.name
-                    tmp_paths.append(input_path)
+        # TODO: Add glossary support in UI if needed
+        # Same content as an earlier upload -> the existing job (and its result) is returned
+        try:
+            job = manager.submit(uploaded_file.getvalue(), name=uploaded_file.name)
+            st.session_state["job_id"] = job.id
+        except JobQueueFull:
+            st.warning("The translation queue is full right now. Please try again in a few minutes.")
+
+job = manager.get(st.session_state.get("job_id")) if "job_id" in st.session_state else None
+
+if job is not None:
+    stage_messages = {
+        None: "Waiting for a free worker...",
+        "parse": "Parsing document...",
+        "translate": "Translating with Claude 3 (this may take a minute)...",
+        "reconstruct": "Reconstructing document...",
+    }
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as tmp_json:
-                    json_path = tmp_json.name
-                    tmp_paths.append(json_path)
-                    
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_output:
-                    output_path = tmp_output.name
-                    tmp_paths.append(output_path)
+    # The job runs in the background pool; this loop only redraws its progress.
+    # A rerun or disconnect leaves the job running and picks it up again here.
+    while not job.finished:
+        progress_bar.progress(job.progress)
+        detail = ""
+        if job.stage == "translate" and job.paragraphs_total:
+            detail = f" ({job.paragraphs_done}/{job.paragraphs_total} paragraphs)"
+        status_text.text(stage_messages.get(job.stage, "Processing...") + detail)
+        time.sleep(POLL_SECONDS)
 
-                # 1. Parse
-                status_text = st.empty()
-                status_text.text("Parsing document...")
-                parsed_data = parse_document(input_path)
-                
-                # 2. Translate
-                status_text.text("Translating with Claude 3 (this may take a minute)...")
-                # TODO: Add glossary support in UI if needed
-                translated_data = translate_segments(parsed_data)
-                
-                if not translated_data:
-                    st.error("Translation returned empty result. Check logs/credentials.")
-                else:
-                    # Save intermediate JSON (optional, for debug or download?)
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(translated_data, f, ensure_ascii=False, indent=2)
+    if job.status == "done":
+        progress_bar.progress(1.0)
+        status_text.text("Done!")
+        st.success("Translation Complete!")
 
-                    # 3. Reconstruct
-                    status_text.text("Reconstructing document...")
-                    reconstruct_docx(input_path, json_path, output_path)
-                    
-                    status_text.text("Done!")
-                    st.success("Translation Complete!")
-                    
-                    # Read result for download
-                    with open(output_path, "rb") as f:
-                        btn = st.download_button(
-                            label="Download Translated Document",
-                            data=f,
-                            file_name=f"translated_{uploaded_file.name}",
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                        )
-                
-                # Cleanup manually? tempfile with delete=False needs manual cleanup.
-                # OS usually handles /tmp cleanup eventually, but good practice.
-                
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-            finally:
-                # Cleanup temp files
-                if 'tmp_paths' in locals():
-                    for p in tmp_paths:
-                        try:
-                            os.remove(p)
-                        except Exception:
-                            # Best-effort cleanup
-                            continue
+        st.download_button(
+            label="Download Translated Document",
+            data=job.output_bytes,
+            file_name=f"translated_{job.name}",
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+    else:
+        progress_bar.empty()
+        status_text.empty()
+        st.error(f"An error occurred: {job.error}")
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MODEL_ID = "anthropic.claude-3-opus-20240229-v1:0"
+DOCUMENT_MARKER = "Here is the document structure to translate:"
+STREAM_CHUNK_CHARS = 40
+
+class TranslationBackend:
+    """
+    Interface behind translate_segments. A backend takes a Messages API request
+    body (JSON string) and answers in the Messages API shape, so translator.py
+    does not care whether the model is Bedrock or a local stand-in.
+    """
+
+    model_id = None
+
+    def invoke(self, body):
+        """Returns the response body dict: {"content": [...], "stop_reason": ..., "usage": {...}}."""
+        raise NotImplementedError
+
+    def invoke_stream(self, body):
+        """Yields Messages API stream events (message_start, content_block_delta, message_delta, ...)."""
+        raise NotImplementedError
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_bedrock_client():
+    """
+    Returns the process-wide Bedrock Runtime client for the configured region.
+
+    Built once and shared by all worker threads (boto3 clients are thread-safe),
+    so keep-alive connections are reused. Connection pool size, retry attempts
+    and connect/read timeouts are configurable through the environment.
+
+    Throttling is retried by QuotaScheduler, which every translation call goes
+    through, so the client makes a single attempt by default: botocore retries
+    underneath would multiply attempts, and the adaptive mode's client-side rate
+    limiter would work against the scheduler's RPM/TPM window.
+    """
+    # Assuming credentials are in env vars or ~/.aws/credentials
+    region = os.environ.get("AWS_REGION", "us-east-1")
+    client = _clients.get(region)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(region)
+        if client is None:
+            config = Config(
+                max_pool_connections=int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", 32)),
+                retries={
+                    "mode": "standard",
+                    "total_max_attempts": int(os.environ.get("BEDROCK_CLIENT_MAX_ATTEMPTS", 1)),
+                },
+                connect_timeout=float(os.environ.get("BEDROCK_CONNECT_TIMEOUT", 10)),
+                read_timeout=float(os.environ.get("BEDROCK_READ_TIMEOUT", 300)),
+                tcp_keepalive=True,
+            )
+            # A dedicated session: creating clients from the default session is not thread-safe
+            session = boto3.session.Session()
+            client = session.client(service_name='bedrock-runtime', region_name=region, config=config)
+            _clients[region] = client
+        return client
+
+class BedrockBackend(TranslationBackend):
+    """AWS Bedrock Runtime (Claude) through the shared, pooled client."""
+
+    def __init__(self, model_id=None, client=None):
+        # Use Opus model by default or from env. Note: Opus ID is 'anthropic.claude-3-opus-20240229-v1:0'
+        self.model_id = model_id or os.environ.get("BEDROCK_MODEL_ID", DEFAULT_MODEL_ID)
+        self.client = client or get_bedrock_client()
+
+    def invoke(self, body):
+        response = self.client.invoke_model(
+            body=body,
+            modelId=self.model_id,
+            accept='application/json',
+            contentType='application/json'
+        )
+        return json.loads(response.get('body').read())
+
+    def invoke_stream(self, body):
+        response = self.client.invoke_model_with_response_stream(
+            body=body,
+            modelId=self.model_id,
+            accept='application/json',
+            contentType='application/json'
+        )
+        for event in response.get('body'):
+            chunk = event.get('chunk')
+            if chunk:
+                yield json.loads(chunk.get('bytes'))
+
+class StubThrottlingError(Exception):
+    """Raised by StubBackend with the same error code shape as botocore's ClientError."""
+
+    def __init__(self):
+        super().__init__("ThrottlingException (simulated)")
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": "simulated"}}
+
+class StubBackend(TranslationBackend):
+    """
+    Local stand-in for Bedrock: answers with deterministic translations in the
+    same JSON shape, after a configurable latency, and can simulate throttling
+    and max_tokens truncation. For load-testing the pipeline offline.
+
+    Randomness is derived from the seed, the request body and how many times that
+    body was sent in a row without succeeding (throttled attempts), so results do
+    not depend on thread scheduling.
+    """
+
+    model_id = "local-stub"
+
+    def __init__(self, latency=None, latency_per_paragraph=None, throttle_rate=None, truncate_rate=None,
+                 seed=None):
+        env = os.environ.get
+        self.latency = float(latency if latency is not None else env("STUB_LATENCY_SECONDS", 0.5))
+        self.latency_per_paragraph = float(latency_per_paragraph if latency_per_paragraph is not None
+                                           else env("STUB_LATENCY_PER_PARAGRAPH", 0.02))
+        self.throttle_rate = float(throttle_rate if throttle_rate is not None else env("STUB_THROTTLE_RATE", 0))
+        self.truncate_rate = float(truncate_rate if truncate_rate is not None else env("STUB_TRUNCATE_RATE", 0))
+        self.seed = int(seed if seed is not None else env("STUB_SEED", 0))
+        self._attempts = {}
+        self._seen_prefixes = set()
+        self._lock = threading.Lock()
+
+    def _rng(self, body):
+        """Returns (rng, digest) for this attempt at the body."""
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}"), digest
+
+    @staticmethod
+    def _paragraphs(request):
+        message = request["messages"][0]["content"]
+        doc = message[message.index(DOCUMENT_MARKER) + len(DOCUMENT_MARKER):]
+        decoder = json.JSONDecoder()
+        parsed, _ = decoder.raw_decode(doc.lstrip())
+        return parsed.get("paragraphs", [])
+
+    def _respond(self, body):
+        """Builds the full reply (and sleeps for the simulated latency)."""
+        rng, digest = self._rng(body)
+        request = json.loads(body)
+        paragraphs = self._paragraphs(request)
+
+        time.sleep((self.latency + self.latency_per_paragraph * len(paragraphs)) * (0.8 + 0.4 * rng.random()))
+        if rng.random() < self.throttle_rate:
+            raise StubThrottlingError()
+        # Only throttled bodies are retried as-is; keep the attempt counts of those alone
+        with self._lock:
+            self._attempts.pop(digest, None)
+
+        items = [{
+            "id": p.get("id"),
+            "translated_text": f"[EN] {p.get('text', '')}",
+            "ai_generated_comments": ["Stub: please review."] if p.get("comments") else [],
+        } for p in paragraphs]
+        text = json.dumps({"paragraphs": items}, ensure_ascii=False)
+
+        stop_reason = "end_turn"
+        max_chars = int(request.get("max_tokens", 4096)) * 4
+        if len(text) > max_chars:
+            text, stop_reason = text[:max_chars], "max_tokens"
+        elif rng.random() < self.truncate_rate:
+            text, stop_reason = text[:int(len(text) * rng.uniform(0.2, 0.8))], "max_tokens"
+
+        system = request.get("system")
+        prefix = json.dumps(system, ensure_ascii=False, sort_keys=True)
+        prefix_tokens = len(prefix) // 4
+        cached = isinstance(system, list) and any(block.get("cache_control") for block in system)
+        with self._lock:
+            hit = cached and prefix in self._seen_prefixes
+            if cached:
+                self._seen_prefixes.add(prefix)
+        usage = {
+            "input_tokens": len(request["messages"][0]["content"]) // 4 + (0 if cached else prefix_tokens),
+            "output_tokens": len(text) // 4,
+            "cache_read_input_tokens": prefix_tokens if hit else 0,
+            "cache_creation_input_tokens": prefix_tokens if cached and not hit else 0,
+        }
+        return text, stop_reason, usage
+
+    def invoke(self, body):
+        text, stop_reason, usage = self._respond(body)
+        return {"content": [{"type": "text", "text": text}], "stop_reason": stop_reason, "usage": usage}
+
+    def invoke_stream(self, body):
+        text, stop_reason, usage = self._respond(body)
+        yield {"type": "message_start", "message": {"usage": dict(usage, output_tokens=0)}}
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            yield {"type": "content_block_delta", "index": 0,
+                   "delta": {"type": "text_delta", "text": text[start:start + STREAM_CHUNK_CHARS]}}
+        yield {"type": "message_delta", "delta": {"stop_reason": stop_reason},
+               "usage": {"output_tokens": usage["output_tokens"]}}
+        yield {"type": "message_stop"}
+
+BACKENDS = {
+    "bedrock": BedrockBackend,
+    "stub": StubBackend,
+}
+
+def get_backend(name=None):
+    """Creates the backend named by `name` or TRANSLATION_BACKEND (default: bedrock)."""
+    name = (name or os.environ.get("TRANSLATION_BACKEND", "bedrock")).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend '{name}' (expected one of: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
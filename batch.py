@@ -0,0 +1,219 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from backends import get_backend
+from checkpoint import CheckpointJournal
+from metrics import RunMetrics, format_usage
+from pipeline import translate_docx
+from scheduler import QuotaScheduler
+from translation_cache import get_default_cache
+
+MANIFEST_NAME = "batch_manifest.json"
+DEFAULT_CONCURRENT_DOCUMENTS = 4
+
+def collect_inputs(sources):
+    """
+    Expands directories (their *.docx files) and glob patterns into a sorted,
+    de-duplicated list of .docx paths. Word lock files (~$*.docx) are skipped.
+    """
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob.glob(os.path.join(source, "*.docx"))
+        else:
+            matches = glob.glob(source) or ([source] if os.path.isfile(source) else [])
+        for path in matches:
+            name = os.path.basename(path)
+            if name.lower().endswith(".docx") and not name.startswith("~$"):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+def file_fingerprint(path):
+    """sha256 of the file contents, so an edited source is translated again."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def output_paths(path, fingerprint, output_dir, taken):
+    """Returns (docx, json) output paths; a clashing file name gets a short content-hash suffix."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem in taken:
+        stem = f"{stem}_{fingerprint[:8]}"
+    taken.add(stem)
+    base = os.path.join(output_dir, stem)
+    return f"{base}_translated.docx", f"{base}_translated.json"
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    """Writes the manifest atomically, so an interrupted run never leaves it half-written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def is_done(entry, fingerprint):
+    return (entry is not None and entry.get("status") == "done" and entry.get("fingerprint") == fingerprint
+            and os.path.exists(entry.get("output_docx", "")))
+
+def run_batch(inputs, output_dir, glossary=None, context_info=None, processes=None, documents=None,
+              force=False, normalize=None, metrics_path=None):
+    """
+    Translates many documents in one run.
+
+    Each document goes through pipeline.translate_docx, like a single-document
+    run. Its CPU-bound lxml stages (normalize, parse, reconstruct) run in a
+    process pool; translation runs in this process on up to `documents`
+    threads that share one QuotaScheduler, translation cache and backend, so
+    the API quota, not the number of documents, bounds the number of in-flight
+    model calls. normalize and metrics_path (JSON-lines sink, one run per
+    document) are as for main.py.
+
+    Per-file status is kept in output_dir/batch_manifest.json and saved after
+    every file; files already marked done with unchanged content are skipped
+    on the next run unless force is True. Within a file, finished model calls
+    are journaled next to its output JSON, so an interrupted file resumes
+    where it stopped.
+
+    Returns:
+        dict: The manifest ({"files": {source path: entry}}).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    files = manifest.setdefault("files", {})
+    manifest_lock = threading.Lock()
+
+    todo = []
+    taken = set()
+    for path in inputs:
+        fingerprint = file_fingerprint(path)
+        entry = files.get(path)
+        if not force and is_done(entry, fingerprint):
+            taken.add(os.path.basename(entry["output_docx"])[:-len("_translated.docx")])
+            continue
+        todo.append((path, fingerprint))
+    for path, fingerprint in todo:
+        output_docx, output_json = output_paths(path, fingerprint, output_dir, taken)
+        files[path] = {"status": "pending", "fingerprint": fingerprint,
+                       "output_docx": output_docx, "output_json": output_json}
+    save_manifest(manifest_path, manifest)
+
+    skipped = len(inputs) - len(todo)
+    print(f"Batch: {len(inputs)} documents, {skipped} already done, {len(todo)} to translate", file=sys.stderr)
+    if not todo:
+        return manifest
+
+    scheduler = QuotaScheduler()
+    cache = get_default_cache()
+    backend = get_backend()
+    documents = documents or int(os.environ.get("TRANSLATION_BATCH_DOCUMENTS", DEFAULT_CONCURRENT_DOCUMENTS))
+    processes = processes or os.cpu_count() or 1
+
+    def update(path, **fields):
+        with manifest_lock:
+            files[path].update(fields)
+            save_manifest(manifest_path, manifest)
+
+    def process_one(path, procs):
+        entry = files[path]
+        name = os.path.basename(path)
+        started = time.perf_counter()
+        update(path, status="running", started_at=time.time())
+
+        def on_parsed(parsed):
+            print(f"[{name}] parsed {len(parsed.get('paragraphs', []))} paragraphs", file=sys.stderr)
+
+        # Entries are keyed by source text, so a journal left by an edited version simply does not match
+        checkpoint = CheckpointJournal(f"{entry['output_json']}.checkpoint.jsonl", resume=True)
+        metrics = RunMetrics(metrics_path, document=name)
+        try:
+            output_bytes, translated = translate_docx(
+                path, glossary=glossary, context_info=context_info, metrics=metrics, on_parsed=on_parsed,
+                normalize=normalize, run_stage=lambda fn, *args: procs.submit(fn, *args).result(),
+                scheduler=scheduler, cache=cache, backend=backend, checkpoint=checkpoint)
+            with open(entry["output_json"], "w", encoding="utf-8") as f:
+                json.dump(translated, f, indent=2, ensure_ascii=False)
+            with open(entry["output_docx"], "wb") as f:
+                f.write(output_bytes)
+        except Exception as e:
+            print(f"[{name}] failed: {e}", file=sys.stderr)
+            checkpoint.close()
+            metrics.close()
+            update(path, status="failed", error=str(e), seconds=round(time.perf_counter() - started, 2))
+            return False
+        checkpoint.close(remove=True)
+        summary = metrics.close()
+        update(path, status="done", error=None, paragraphs=len(translated.get("paragraphs", [])),
+               seconds=round(time.perf_counter() - started, 2), stages=summary["stages"],
+               finished_at=time.time())
+        print(f"[{name}] done -> {entry['output_docx']} ({format_usage(summary)})", file=sys.stderr)
+        return True
+
+    # spawn: worker processes must not inherit the translation threads' locks
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as procs, \
+            ThreadPoolExecutor(max_workers=max(1, min(documents, len(todo)))) as threads:
+        results = list(threads.map(lambda item: process_one(item[0], procs), todo))
+
+    print(f"Batch finished: {sum(results)} done, {len(results) - sum(results)} failed, {skipped} skipped",
+          file=sys.stderr)
+    return manifest
+
+def load_json_file(path):
+    if not path:
+        return {}
+    if not os.path.exists(path):
+        print(f"Error: File not found {path}", file=sys.stderr)
+        sys.exit(1)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py batch",
+                                     description="Translate every .docx in directories or glob patterns")
+    parser.add_argument("sources", nargs="+", help="Directories, .docx files or glob patterns (quote them)")
+    parser.add_argument("--output_dir", help="Directory for translated documents and the manifest",
+                        default="translated")
+    parser.add_argument("--glossary", help="Path to glossary JSON", default=None)
+    parser.add_argument("--context", help="Path to context JSON", default=None)
+    parser.add_argument("--processes", type=int, help="Parse/reconstruct worker processes (default: CPU count)",
+                        default=None)
+    parser.add_argument("--documents", type=int, default=None,
+                        help=f"Documents translated concurrently (default: TRANSLATION_BATCH_DOCUMENTS "
+                             f"or {DEFAULT_CONCURRENT_DOCUMENTS})")
+    parser.add_argument("--force", action="store_true", help="Translate files already marked done in the manifest")
+    parser.add_argument("--normalize_runs", action="store_true", default=None,
+                        help="Merge fragmented runs and drop rsid noise before parsing (default: DOCX_NORMALIZE_RUNS)")
+    parser.add_argument("--metrics", help="Append per-stage timing, token usage and cost as JSON lines to this file",
+                        default=os.environ.get("TRANSLATION_METRICS_PATH") or None)
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.sources)
+    if not inputs:
+        print("Error: No .docx files found", file=sys.stderr)
+        return 1
+
+    manifest = run_batch(inputs, args.output_dir, glossary=load_json_file(args.glossary),
+                         context_info=load_json_file(args.context), processes=args.processes,
+                         documents=args.documents, force=args.force, normalize=args.normalize_runs,
+                         metrics_path=args.metrics)
+    failed = [path for path in inputs if manifest["files"].get(path, {}).get("status") != "done"]
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
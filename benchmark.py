@@ -0,0 +1,447 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from lxml import etree
+
+from generate_test_docx import RELS, STYLES
+import parser as ifrs_parser
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NAMESPACES = {'w': W_NS}
+
+DEFAULT_SCALES = [1000, 10000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TOLERANCE = 0.25
+# Stage times are compared as multiples of a reference workload timed alongside them (a plain
+# lxml parse + serialize of the same document.xml), so the baseline holds on faster or slower machines
+STAGES = ("parser.parse_document", "docx_parser.parse_document", "reconstructor.reconstruct_docx")
+# Slack on top of the relative tolerance, so small stages don't fail on noise
+MIN_SLACK = {"relative": 1.0, "rss_growth_mb": 8.0}
+# Stages whose reference run is shorter than this are too quick to time reliably; only memory is gated
+MIN_REFERENCE_SECONDS = 0.05
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+  <Default Extension="xml" ContentType="application/xml"/>
+  <Default Extension="png" ContentType="image/png"/>
+  <Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+  <Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+  <Override PartName="/word/comments.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"/>
+</Types>"""
+
+def synthetic_png(width, height, seed=0):
+    """An incompressible (noise) RGB PNG, standing in for photos embedded in annual reports."""
+    rng = random.Random(seed)
+    raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b"")
+
+def _paragraph_xml(i, revision_every, comment_every):
+    parts = ['<w:p>']
+    parts.append(f'<w:r><w:rPr><w:b/></w:rPr><w:t>当期純利益は{i:,}百万円</w:t></w:r>')
+    parts.append('<w:r><w:t xml:space="preserve">となりました。</w:t></w:r>')
+    if revision_every and i % revision_every == 0:
+        parts.append(f'<w:ins w:id="{2 * i}" w:author="Reviewer"><w:r><w:t>（前期比▲{i}）</w:t></w:r></w:ins>')
+        parts.append(f'<w:del w:id="{2 * i + 1}" w:author="Reviewer"><w:r><w:delText>旧</w:delText></w:r></w:del>')
+    if comment_every and i % comment_every == 0:
+        parts.append(f'<w:r><w:commentReference w:id="{i // comment_every}"/></w:r>')
+    parts.append('</w:p>')
+    return "".join(parts)
+
+def _image_paragraph_xml(rel_id, idx):
+    return (f'<w:p><w:r><w:drawing><wp:inline><wp:extent cx="952500" cy="952500"/>'
+            f'<wp:docPr id="{idx + 1}" name="Picture {idx + 1}"/>'
+            f'<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<pic:pic><pic:blipFill><a:blip r:embed="{rel_id}"/></pic:blipFill></pic:pic>'
+            f'</a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>')
+
+def synthetic_document_xml(n_paragraphs, table_every=0, revision_every=5, comment_every=7, image_rel_ids=()):
+    """
+    Builds a document.xml with n_paragraphs paragraphs. Every revision_every-th
+    paragraph carries a tracked insertion/deletion, every comment_every-th a
+    comment reference, and every table_every-th is followed by a 3x3 table.
+    Image paragraphs referencing image_rel_ids are spread through the body.
+    """
+    parts = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             f'<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}"'
+             ' xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"'
+             ' xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+             ' xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"><w:body>']
+    image_at = {}
+    if image_rel_ids:
+        step = max(1, n_paragraphs // len(image_rel_ids))
+        image_at = {k * step: (rel_id, k) for k, rel_id in enumerate(image_rel_ids)}
+    for i in range(n_paragraphs):
+        parts.append(_paragraph_xml(i, revision_every, comment_every))
+        if i in image_at:
+            parts.append(_image_paragraph_xml(*image_at[i]))
+        if table_every and i % table_every == table_every - 1:
+            parts.append('<w:tbl>')
+            for row in range(3):
+                parts.append('<w:tr>')
+                for col in range(3):
+                    parts.append(f'<w:tc><w:p><w:r><w:t>{row * 3 + col:,}千円</w:t></w:r></w:p></w:tc>')
+                parts.append('</w:tr>')
+            parts.append('</w:tbl>')
+    parts.append('</w:body></w:document>')
+    return "".join(parts)
+
+def synthetic_docx_bytes(n_paragraphs, table_every=0, revision_every=5, comment_every=7, images=0, image_px=256):
+    """Returns a .docx (as bytes) with the given scale and features; see synthetic_document_xml."""
+    n_comments = (n_paragraphs // comment_every + 1) if comment_every else 1
+    comments = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:comments xmlns:w="{W_NS}">']
+    for c in range(n_comments):
+        comments.append(f'<w:comment w:id="{c}" w:author="Bench"><w:p><w:r><w:t>確認してください。{c}</w:t>'
+                        '</w:r></w:p></w:comment>')
+    comments.append('</w:comments>')
+
+    rels = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+            '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments" Target="comments.xml"/>']
+    image_rel_ids = []
+    for k in range(images):
+        rel_id = f"rId{100 + k}"
+        image_rel_ids.append(rel_id)
+        rels.append(f'<Relationship Id="{rel_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" Target="media/image{k + 1}.png"/>')
+    rels.append('</Relationships>')
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml', CONTENT_TYPES)
+        z.writestr('_rels/.rels', RELS)
+        z.writestr('word/_rels/document.xml.rels', "".join(rels))
+        z.writestr('word/document.xml', synthetic_document_xml(
+            n_paragraphs, table_every, revision_every, comment_every, image_rel_ids))
+        z.writestr('word/styles.xml', STYLES)
+        z.writestr('word/comments.xml', "".join(comments))
+        for k in range(images):
+            z.writestr(f'word/media/image{k + 1}.png', synthetic_png(image_px, image_px, seed=k))
+    return buf.getvalue()
+
+def xpath_scan_paragraph(p):
+    """Reference implementation: one descendant XPath query per feature (pre single-pass parser)."""
+    text = "".join(p.xpath('.//w:t/text()', namespaces=NAMESPACES))
+    revisions = []
+    for ins in p.xpath('.//w:ins', namespaces=NAMESPACES):
+        revisions.append({"type": "insert", "author": ins.get(f"{{{W_NS}}}author"),
+                          "text": "".join(ins.xpath('.//w:t/text()', namespaces=NAMESPACES)),
+                          "id": ins.get(f"{{{W_NS}}}id")})
+    for dl in p.xpath('.//w:del', namespaces=NAMESPACES):
+        revisions.append({"type": "delete", "author": dl.get(f"{{{W_NS}}}author"),
+                          "text": "".join(dl.xpath('.//w:delText/text()', namespaces=NAMESPACES)),
+                          "id": dl.get(f"{{{W_NS}}}id")})
+    refs = [r.get(f"{{{W_NS}}}id") for r in p.xpath('.//w:commentReference', namespaces=NAMESPACES)]
+    return text, revisions, refs
+
+def best_of(fn, repeat):
+    """Returns the fastest wall time (seconds) of `repeat` runs of fn()."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def bench_paragraph_scan(n_paragraphs, repeat=3):
+    """Times XPath-per-feature extraction against the single-pass scan on the same tree."""
+    root = etree.fromstring(synthetic_document_xml(n_paragraphs).encode("utf-8"))
+    paras = list(root.iter(f"{{{W_NS}}}p"))
+
+    for p in paras[:50]:
+        assert xpath_scan_paragraph(p) == ifrs_parser.scan_paragraph(p)
+
+    xpath_time = best_of(lambda: [xpath_scan_paragraph(p) for p in paras], repeat)
+    single_time = best_of(lambda: [ifrs_parser.scan_paragraph(p) for p in paras], repeat)
+    return {"paragraphs": n_paragraphs, "xpath_s": xpath_time, "single_pass_s": single_time,
+            "speedup": xpath_time / single_time if single_time else float("inf")}
+
+def fragment_document_xml(xml, chunk=3):
+    """
+    Splits every single-text run into runs of `chunk` characters carrying rsid
+    attributes, with w:proofErr markers between some of them, the way Word
+    leaves text after many review cycles.
+    """
+    root = etree.fromstring(xml.encode("utf-8"))
+    w = f"{{{W_NS}}}"
+    for run in list(root.iter(f"{w}r")):
+        texts = [child for child in run if child.tag == f"{w}t"]
+        if len(texts) != 1 or len(texts[0].text or "") <= chunk:
+            continue
+        text = texts[0].text
+        rpr = run.find(f"{w}rPr")
+        parent = run.getparent()
+        pos = parent.index(run)
+        parent.remove(run)
+        for k, start in enumerate(range(0, len(text), chunk)):
+            if k % 2:
+                marker = etree.Element(f"{w}proofErr")
+                marker.set(f"{w}type", "spellStart" if k % 4 == 1 else "spellEnd")
+                parent.insert(pos, marker)
+                pos += 1
+            piece = etree.Element(f"{w}r")
+            piece.set(f"{w}rsidR", f"00{k % 7:02d}1A2B")
+            piece.set(f"{w}rsidRPr", f"00{k % 5:02d}3C4D")
+            if rpr is not None:
+                piece.append(etree.fromstring(etree.tostring(rpr)))
+            t = etree.SubElement(piece, f"{w}t")
+            t.text = text[start:start + chunk]
+            t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+            parent.insert(pos, piece)
+            pos += 1
+    return etree.tostring(root, encoding="UTF-8", xml_declaration=True, standalone=True)
+
+def bench_normalize(n_paragraphs, repeat=3, chunk=3):
+    """
+    Parse + reconstruct of a fragmented document as-is, against normalizing
+    it first (normalize.normalize_package, as pipeline.translate_docx does).
+    """
+    import reconstructor
+    from normalize import normalize_package
+
+    src = io.BytesIO(synthetic_docx_bytes(n_paragraphs))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            data = zin.read(info)
+            if info.filename == 'word/document.xml':
+                data = fragment_document_xml(data.decode("utf-8"), chunk)
+            zout.writestr(info, data)
+    docx_bytes = buf.getvalue()
+
+    parsed = ifrs_parser.parse_document(io.BytesIO(docx_bytes))
+    translated = {"paragraphs": [dict(p, translated_text=f"Translated {p['id']}", ai_generated_comments=[])
+                                 for p in parsed["paragraphs"]]}
+    outputs = {}
+
+    def run(normalize):
+        source = io.BytesIO(docx_bytes)
+        if normalize:
+            normalized = io.BytesIO()
+            normalize_package(source, normalized)
+            source = normalized
+        assert ifrs_parser.parse_document(source) == parsed
+        out = io.BytesIO()
+        reconstructor.reconstruct_package(source, translated, out)
+        outputs[normalize] = len(out.getvalue())
+
+    result = {"paragraphs": n_paragraphs,
+              "raw_s": best_of(lambda: run(False), repeat),
+              "normalized_s": best_of(lambda: run(True), repeat)}
+    result["output_raw_bytes"], result["output_normalized_bytes"] = outputs[False], outputs[True]
+    result.update(normalize_package(io.BytesIO(docx_bytes), io.BytesIO()))
+    return result
+
+def _peak_rss_mb():
+    # ru_maxrss survives exec on Linux, so a spawned child would report the parent's peak;
+    # VmHWM belongs to this process's own address space
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _reference_workload(docx_path):
+    with zipfile.ZipFile(docx_path) as z:
+        etree.tostring(etree.fromstring(z.read("word/document.xml")))
+
+def _measure_stage(stage, docx_path, json_path, repeat, queue):
+    """
+    Child-process body: times one stage and reports its peak RSS, and how far
+    the stage raised it above the interpreter and imports (rss_growth_mb).
+    """
+    try:
+        if stage == "parser.parse_document":
+            fn = lambda: ifrs_parser.parse_document(docx_path)
+        elif stage == "parser.iter_paragraphs":
+            # Consumed one record at a time, as a streaming caller would
+            fn = lambda: sum(1 for _ in ifrs_parser.iter_paragraphs(docx_path))
+        elif stage == "docx_parser.parse_document":
+            import docx_parser
+            fn = lambda: docx_parser.parse_document(docx_path)
+        else:
+            import contextlib
+            import reconstructor
+            out_path = docx_path + ".out.docx"
+
+            def fn():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    reconstructor.reconstruct_docx(docx_path, json_path, out_path)
+        reference_fn = lambda: _reference_workload(docx_path)
+        rss_before = _peak_rss_mb()
+        times = [best_of(fn, 1)]
+        peak = _peak_rss_mb()
+        references = [best_of(reference_fn, 1)]
+        # Alternate stage and reference runs so each pair is timed under the same machine load
+        for _ in range(repeat - 1):
+            times.append(best_of(fn, 1))
+            references.append(best_of(reference_fn, 1))
+        ratios = sorted(t / r for t, r in zip(times, references))
+        queue.put({"seconds": min(times), "reference_seconds": min(references),
+                   "relative": ratios[len(ratios) // 2], "peak_rss_mb": peak, "rss_growth_mb": peak - rss_before})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+def run_stage(stage, docx_path, json_path, repeat):
+    """Runs a stage in a fresh interpreter so peak RSS reflects that stage alone."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure_stage, args=(stage, docx_path, json_path, repeat, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    if "error" in result:
+        raise RuntimeError(f"{stage} failed: {result['error']}")
+    return result
+
+def bench_scale(n_paragraphs, repeat, workdir, images=4, table_every=20):
+    """Generates one synthetic document and measures every stage on it."""
+    docx_path = os.path.join(workdir, f"bench_{n_paragraphs}.docx")
+    with open(docx_path, "wb") as f:
+        f.write(synthetic_docx_bytes(n_paragraphs, table_every=table_every, images=images))
+
+    parsed = ifrs_parser.parse_document(docx_path)
+    translated = {"paragraphs": [
+        {"id": p["id"], "hash": p["hash"], "translated_text": f"Translated {p['id']}",
+         "ai_generated_comments": ["Check wording."] if i % 50 == 0 else []}
+        for i, p in enumerate(parsed["paragraphs"])
+    ]}
+    json_path = os.path.join(workdir, f"bench_{n_paragraphs}.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(translated, f, ensure_ascii=False)
+
+    return {stage: run_stage(stage, docx_path, json_path, repeat) for stage in STAGES}
+
+def bench_streaming_parse(n_paragraphs, repeat, workdir):
+    """Peak RSS growth and time of parse_document against consuming iter_paragraphs."""
+    docx_path = os.path.join(workdir, f"stream_{n_paragraphs}.docx")
+    with open(docx_path, "wb") as f:
+        f.write(synthetic_docx_bytes(n_paragraphs, table_every=20))
+    return {stage: run_stage(stage, docx_path, None, repeat)
+            for stage in ("parser.parse_document", "parser.iter_paragraphs")}
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Returns human-readable regressions where a stage's relative time (multiple
+    of the reference stage) or RSS growth exceeds
+    max(baseline * (1 + tolerance), baseline + MIN_SLACK). Time is not gated
+    at scales too small to time reliably (MIN_REFERENCE_SECONDS).
+    """
+    regressions = []
+    for scale, stages in results.items():
+        for stage, metrics in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if not base:
+                continue
+            for metric, slack in MIN_SLACK.items():
+                if metric not in base:
+                    continue
+                if metric == "relative" and metrics["reference_seconds"] < MIN_REFERENCE_SECONDS:
+                    continue
+                limit = max(base[metric] * (1 + tolerance), base[metric] + slack)
+                if metrics[metric] > limit:
+                    regressions.append(f"{scale} paragraphs / {stage}: {metric} {metrics[metric]:.3f} "
+                                       f"> {limit:.3f} (baseline {base[metric]:.3f})")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Parse/reconstruct benchmarks on synthetic documents")
+    ap.add_argument("--paragraphs", type=int, nargs="+", default=DEFAULT_SCALES,
+                    help="Document sizes to benchmark (e.g. 1000 10000 100000)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--images", type=int, default=4, help="Embedded images per document")
+    ap.add_argument("--table-every", type=int, default=20, help="Insert a table after every N paragraphs (0 = none)")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                    help="Allowed slowdown relative to the reference stage / memory growth over baseline (0.25 = 25%%)")
+    ap.add_argument("--update-baseline", action="store_true", help="Write these results as the new baseline")
+    ap.add_argument("--scan", action="store_true", help="Only compare XPath vs single-pass paragraph scanning")
+    ap.add_argument("--streaming-parse", action="store_true",
+                    help="Only compare peak memory of parse_document and iter_paragraphs")
+    ap.add_argument("--normalize", action="store_true",
+                    help="Only compare parse/reconstruct of fragmented documents with and without run normalization")
+    args = ap.parse_args()
+
+    if args.normalize:
+        from normalize import format_stats
+        for n in args.paragraphs:
+            res = bench_normalize(n, args.repeat)
+            print(f"{n:>7} paragraphs: {format_stats(res)}")
+            print(f"{'':>19} parse + reconstruct {res['raw_s']:.3f}s -> {res['normalized_s']:.3f}s "
+                  f"(normalization included), output docx {res['output_raw_bytes']} -> "
+                  f"{res['output_normalized_bytes']} bytes")
+        return
+
+    if args.streaming_parse:
+        with tempfile.TemporaryDirectory() as workdir:
+            for n in args.paragraphs:
+                for stage, res in bench_streaming_parse(n, args.repeat, workdir).items():
+                    print(f"{n:>7} paragraphs  {stage:<24} {res['seconds']:8.3f}s  "
+                          f"RSS growth {res['rss_growth_mb']:7.1f} MB")
+        return
+
+    if args.scan:
+        for n in args.paragraphs:
+            res = bench_paragraph_scan(n, args.repeat)
+            print(f"{res['paragraphs']} paragraphs: xpath {res['xpath_s']:.3f}s, "
+                  f"single-pass {res['single_pass_s']:.3f}s ({res['speedup']:.1f}x)")
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.paragraphs:
+            results[str(n)] = bench_scale(n, args.repeat, workdir, args.images, args.table_every)
+            for stage, metrics in results[str(n)].items():
+                relative = f"{metrics['relative']:5.2f}x ref" if "relative" in metrics else " " * 9
+                print(f"{n:>7} paragraphs  {stage:<32} {metrics['seconds']:8.3f}s  {relative}  "
+                      f"peak RSS {metrics['peak_rss_mb']:8.1f} MB (+{metrics['rss_growth_mb']:.1f} MB)")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions against baseline:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
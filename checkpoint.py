@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import threading
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of translated paragraphs.
+
+    translate_segments records every batch result as soon as the model call
+    returns, keyed by the same paragraph key as the translation cache (source
+    text, relevant glossary, context, prompt and model), so a crashed run can
+    be resumed without repeating finished calls. Each write is flushed and
+    fsynced; a torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.completed = {}
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+            print(f"Checkpoint: resuming from {path} ({len(self.completed)} distinct translated texts)",
+                  file=sys.stderr)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and record.get("key") and record.get("translated_text"):
+                    self.completed[record["key"]] = {
+                        "translated_text": record["translated_text"],
+                        "ai_generated_comments": record.get("ai_generated_comments") or [],
+                    }
+
+    def get(self, key):
+        """Returns the journaled item dict for a paragraph key, or None."""
+        return self.completed.get(key)
+
+    def record(self, items):
+        """Appends (key, item_dict) pairs and syncs them to disk."""
+        entries = [(key, {
+            "translated_text": item.get("translated_text"),
+            "ai_generated_comments": item.get("ai_generated_comments") or [],
+        }, item.get("id")) for key, item in items if item.get("translated_text")]
+        if not entries:
+            return
+        with self._lock:
+            for key, entry, pid in entries:
+                self._file.write(json.dumps(dict(entry, key=key, id=pid), ensure_ascii=False) + "\n")
+                self.completed[key] = entry
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self, remove=False):
+        """Closes the journal; remove=True deletes it (the run's output is safely written)."""
+        with self._lock:
+            self._file.close()
+            if remove and os.path.exists(self.path):
+                os.remove(self.path)
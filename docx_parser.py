@@ -1,5 +1,6 @@
 import zipfile
 from lxml import etree
+from paragraph_index import format_paragraph_id
 import json
 import os
 
@@ -71,7 +72,7 @@ def parse_document(docx_path):
                 seen_ids.add(c_id)
         
         segment = {
-            "id": f"para_{i:03d}",
+            "id": format_paragraph_id(i),
             "original_text": original_text,
             "associated_comments": associated_comments
         }
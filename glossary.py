@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict, deque
+
+MATCHER_CACHE_SIZE = 8
+
+class GlossaryMatcher:
+    """
+    Aho-Corasick automaton over glossary terms. Finds every term occurring in
+    a text in a single pass, independent of how many terms the glossary has.
+    """
+
+    def __init__(self, terms):
+        self.terms = [t for t in dict.fromkeys(terms) if t]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for idx, term in enumerate(self.terms):
+            node = 0
+            for ch in term:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(idx)
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_indexes(self, text, found=None):
+        """Adds the index of every term occurring in text to `found` (a set) and returns it."""
+        found = set() if found is None else found
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text or "":
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+    def find(self, text):
+        """Returns the set of terms occurring in text."""
+        return {self.terms[i] for i in self.find_indexes(text)}
+
+_matchers = OrderedDict()
+_matchers_lock = threading.Lock()
+
+def get_matcher(glossary):
+    """Returns a compiled matcher for the glossary's terms, reusing one built earlier for the same terms."""
+    key = tuple(glossary)
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+        if matcher is not None:
+            _matchers.move_to_end(key)
+            return matcher
+    matcher = GlossaryMatcher(key)
+    with _matchers_lock:
+        _matchers[key] = matcher
+        while len(_matchers) > MATCHER_CACHE_SIZE:
+            _matchers.popitem(last=False)
+    return matcher
+
+def relevant_glossary(glossary, texts):
+    """
+    Returns the subset of glossary whose terms occur in any of texts,
+    preserving the glossary's own order.
+    """
+    if not glossary:
+        return {}
+    matcher = get_matcher(glossary)
+    found = set()
+    for text in texts:
+        matcher.find_indexes(text, found)
+    return {matcher.terms[i]: glossary[matcher.terms[i]] for i in sorted(found)}
@@ -0,0 +1,98 @@
+import sys
+from difflib import SequenceMatcher
+
+from paragraph_index import content_hash
+from translator import _normalize_translation, translate_segments
+
+def _para_hash(para):
+    return para.get("hash") or content_hash(para.get("text", ""))
+
+def is_translated(item):
+    """
+    False for items whose translation failed: the fallback copies the source
+    text into translated_text. Text that translates to itself (bare figures)
+    is sent again too, which costs little and usually hits the cache.
+    """
+    translated = item.get("translated_text")
+    return bool(translated) and translated != item.get("text")
+
+def align_with_previous(paragraphs, previous_paragraphs, previous_translation):
+    """
+    Matches the paragraphs of a new draft against the previous draft.
+
+    The two drafts are aligned by a sequence diff over paragraph content hashes,
+    so unchanged runs are matched positionally even when paragraphs were added
+    or removed around them. Paragraphs outside the matched runs still reuse a
+    previous translation if identical text appears anywhere in the old draft
+    (moved paragraphs). Previous items left untranslated by a failed batch are
+    never reused, so they are retried.
+
+    Returns (reused, pending): reused maps new paragraph ID -> previous
+    translation item (re-keyed to the new ID); pending lists the new
+    paragraphs that need translating.
+    """
+    # Items whose source text no longer matches how the previous draft parses (e.g. a
+    # text box container translated together with its text box by an older version) are
+    # translated again rather than reused
+    old_texts = {p.get("id"): p.get("text", "") for p in previous_paragraphs}
+    prev_items = {}
+    for item in (previous_translation or {}).get("paragraphs", []):
+        pid = item.get("id")
+        if not pid or not is_translated(item):
+            continue
+        if "text" in item and item["text"] != old_texts.get(pid):
+            continue
+        prev_items[pid] = item
+
+    old_hashes = [_para_hash(p) for p in previous_paragraphs]
+    new_hashes = [_para_hash(p) for p in paragraphs]
+
+    # Any translated old paragraph, by content, for moved text
+    by_hash = {}
+    for para, h in zip(previous_paragraphs, old_hashes):
+        if para.get("id") in prev_items:
+            by_hash.setdefault(h, prev_items[para["id"]])
+
+    matched = {}
+    matcher = SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            continue
+        for offset in range(i2 - i1):
+            old_id = previous_paragraphs[i1 + offset].get("id")
+            if old_id in prev_items:
+                matched[j1 + offset] = prev_items[old_id]
+
+    reused = {}
+    pending = []
+    for j, para in enumerate(paragraphs):
+        item = matched.get(j) or by_hash.get(new_hashes[j])
+        if item is None:
+            pending.append(para)
+        else:
+            reused[para["id"]] = dict(item, id=para["id"])
+    return reused, pending
+
+def translate_incremental(data, previous_data, previous_translation, glossary=None, context_info=None,
+                          **translate_kwargs):
+    """
+    Translates a revised draft, sending only changed or new paragraphs to
+    translate_segments and reusing the previous translation for the rest.
+
+    Args:
+        data (dict): Parsed new draft (parser.parse_document output).
+        previous_data (dict): Parsed previous draft.
+        previous_translation (dict): Translation JSON produced for the previous draft.
+    """
+    paragraphs = data.get("paragraphs", [])
+    reused, pending = align_with_previous(paragraphs, previous_data.get("paragraphs", []), previous_translation)
+    print(f"Incremental: reusing {len(reused)} paragraphs, translating {len(pending)} changed/new",
+          file=sys.stderr)
+
+    fresh = []
+    if pending:
+        translated = translate_segments({"paragraphs": pending}, glossary=glossary, context_info=context_info,
+                                        **translate_kwargs)
+        fresh = translated.get("paragraphs", [])
+
+    return _normalize_translation(data, {"paragraphs": list(reused.values()) + fresh})
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import translate_docx
+from scheduler import QuotaScheduler
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_KEPT_JOBS = 32
+DEFAULT_MAX_QUEUED = 16
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when max_queued jobs are already waiting."""
+
+def job_key(docx_bytes, glossary=None, context_info=None):
+    """Content hash of an upload plus the options that change its translation."""
+    digest = hashlib.sha256(docx_bytes)
+    digest.update(json.dumps([glossary or {}, context_info or {}], ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+class Job:
+    """
+    One document translation running in the background. Fields are updated
+    by the worker thread and read by whoever polls the job.
+    """
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = "queued"    # queued -> running -> done | failed
+        self.stage = None         # parse / translate / reconstruct while running
+        self.paragraphs_total = 0
+        self.paragraphs_done = 0
+        self.output_bytes = None
+        self.translated_data = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    @property
+    def progress(self):
+        """Fraction complete, 0.0-1.0; translation counts for most of it."""
+        if self.status == "done":
+            return 1.0
+        if self.stage == "translate" and self.paragraphs_total:
+            return 0.05 + 0.9 * min(1.0, self.paragraphs_done / self.paragraphs_total)
+        return {"parse": 0.0, "reconstruct": 0.95}.get(self.stage, 0.0)
+
+    def _paragraph_done(self, item):
+        with self._lock:
+            self.paragraphs_done += 1
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "paragraphs_total": self.paragraphs_total,
+            "paragraphs_done": self.paragraphs_done,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobManager:
+    """
+    Bounded pool of background translation jobs.
+
+    At most max_workers documents are processed at once; all of them share one
+    QuotaScheduler, so the Bedrock quota is split between concurrent users
+    instead of each job assuming it has the whole quota. A submission whose
+    content hash matches a queued, running or finished job returns that job
+    instead of starting a new one. The most recent `keep` jobs (and their
+    output) are kept in memory.
+
+    At most max_queued jobs may wait for a worker; further submissions raise
+    JobQueueFull so callers can push back instead of queueing without bound.
+    """
+
+    def __init__(self, max_workers=None, keep=None, scheduler=None, max_queued=None, backend=None):
+        self.max_workers = max_workers or int(os.environ.get("TRANSLATION_JOB_WORKERS", DEFAULT_JOB_WORKERS))
+        self.keep = keep or int(os.environ.get("TRANSLATION_KEPT_JOBS", DEFAULT_KEPT_JOBS))
+        self.max_queued = max_queued or int(os.environ.get("TRANSLATION_JOB_QUEUE", DEFAULT_MAX_QUEUED))
+        self.scheduler = scheduler or QuotaScheduler()
+        self.backend = backend   # None: TRANSLATION_BACKEND (see backends.get_backend)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="translation-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()   # id -> Job, oldest first
+        self._by_key = {}            # content key -> Job
+
+    def submit(self, docx_bytes, name=None, glossary=None, context_info=None):
+        """Queues a document (bytes) for translation and returns its Job."""
+        key = job_key(docx_bytes, glossary, context_info)
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and existing.status != "failed":
+                self._jobs.move_to_end(existing.id)
+                return existing
+            if self._count("queued") >= self.max_queued:
+                raise JobQueueFull(f"{self.max_queued} jobs are already waiting")
+            job = Job(key, name)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._trim()
+        self._executor.submit(self._run, job, docx_bytes, glossary, context_info)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _count(self, status):
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def stats(self):
+        """Counts of jobs by status, plus the pool limits."""
+        with self._lock:
+            counts = {status: self._count(status) for status in ("queued", "running", "done", "failed")}
+        return dict(counts, workers=self.max_workers, max_queued=self.max_queued)
+
+    def _trim(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def _run(self, job, docx_bytes, glossary, context_info):
+        job.status = "running"
+
+        def on_stage(stage):
+            job.stage = stage
+
+        def on_parsed(data):
+            job.paragraphs_total = len(data.get("paragraphs", []))
+
+        try:
+            job.output_bytes, job.translated_data = translate_docx(
+                docx_bytes, glossary=glossary, context_info=context_info, progress=on_stage,
+                on_parsed=on_parsed, on_paragraph=job._paragraph_done, scheduler=self.scheduler,
+                backend=self.backend)
+            status = "done"
+        except Exception as e:
+            print(f"Job {job.id} ({job.name}) failed: {e}", file=sys.stderr)
+            job.error = str(e)
+            status = "failed"
+        # Set last: pollers treat a finished status as "all fields are final"
+        job.finished_at = time.time()
+        job.status = status
+        with self._lock:
+            self._trim()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,70 @@
+import json
+
+class ParagraphStreamParser:
+    """
+    Incremental parser for the model's {"paragraphs": [...]} reply.
+
+    Text is fed as it streams in; every paragraph object in the array is
+    returned as soon as its closing brace arrives, without waiting for the rest
+    of the response. Anything before the array (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = []        # characters of the object currently being read
+        self._prefix = ""        # text seen before the paragraphs array starts
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Consumes a chunk of text and returns the list of paragraph dicts completed by it."""
+        completed = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._in_array:
+                self._prefix += ch
+                idx = self._prefix.find('"paragraphs"')
+                if idx != -1 and self._prefix.rstrip().endswith("["):
+                    self._in_array = True
+                    self._prefix = ""
+                continue
+
+            if self._depth > 0:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = self._depth > 0
+            elif ch == "{":
+                if self._depth == 0:
+                    self._buffer = [ch]
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._decode("".join(self._buffer))
+                    if item is not None:
+                        completed.append(item)
+                    self._buffer = []
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+        return completed
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
@@ -2,17 +2,36 @@ import argparse
 import json
 import os
 import sys
-from parser import parse_document
-from translator import translate_segments
-from reconstructor import reconstruct_docx
+import threading
+import batch
+from checkpoint import CheckpointJournal
+from metrics import RunMetrics, format_usage
+from pipeline import translate_docx
 
 def main():
-    parser = argparse.ArgumentParser(description="IFRS Document Translation System (Bedrock)")
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(batch.main(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(description="IFRS Document Translation System (Bedrock)",
+                                     epilog="Use 'main.py batch DIR_OR_GLOB ...' to translate many documents.")
     parser.add_argument("docx_file", help="Path to the original .docx file")
     parser.add_argument("--output_json", help="Path to save intermediate translated JSON", default="translation_result.json")
     parser.add_argument("--output_docx", help="Path to save final translated .docx", default="translated_output.docx")
     parser.add_argument("--glossary", help="Path to glossary JSON", default=None)
     parser.add_argument("--context", help="Path to context JSON", default=None)
+    parser.add_argument("--previous_docx", help="Previous draft .docx; with --previous_json, only changed paragraphs are translated", default=None)
+    parser.add_argument("--previous_json", help="Translation JSON produced for --previous_docx", default=None)
+    parser.add_argument("--stream", action="store_true", help="Stream Bedrock responses and report each paragraph as soon as it is translated")
+    parser.add_argument("--normalize_runs", action="store_true", default=None,
+                        help="Merge fragmented runs and drop rsid noise before parsing (default: DOCX_NORMALIZE_RUNS)")
+    parser.add_argument("--checkpoint", help="Journal of finished batches (default: <output_json>.checkpoint.jsonl)",
+                        default=None)
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse the paragraphs already in the checkpoint journal and translate only the rest")
+    parser.add_argument("--overwrite_checkpoint", action="store_true",
+                        help="Start over even if a checkpoint journal from an earlier run exists")
+    parser.add_argument("--metrics", help="Append per-stage timing, token usage and cost as JSON lines to this file",
+                        default=os.environ.get("TRANSLATION_METRICS_PATH") or None)
     
     args = parser.parse_args()
     
@@ -20,14 +39,18 @@ def main():
         print(f"Error: File not found {args.docx_file}", file=sys.stderr)
         sys.exit(1)
 
-    # 1. Parse
-    print(f"Parsing {args.docx_file}...", file=sys.stderr)
-    try:
-        parsed_data = parse_document(args.docx_file)
-    except Exception as e:
-        print(f"Parsing failed: {e}", file=sys.stderr)
-        sys.exit(1)
-        
+    previous = None
+    if args.previous_docx or args.previous_json:
+        if not (args.previous_docx and args.previous_json):
+            print("Error: --previous_docx and --previous_json must be given together", file=sys.stderr)
+            sys.exit(1)
+        for path in (args.previous_docx, args.previous_json):
+            if not os.path.exists(path):
+                print(f"Error: File not found {path}", file=sys.stderr)
+                sys.exit(1)
+        with open(args.previous_json, 'r', encoding='utf-8') as f:
+            previous = (args.previous_docx, json.load(f))
+
     # Load Glossary/Context if provided
     glossary = {}
     if args.glossary and os.path.exists(args.glossary):
@@ -39,31 +62,72 @@ def main():
         with open(args.context, 'r', encoding='utf-8') as f:
             context_info = json.load(f)
 
-    # 2. Translate (Bedrock)
-    print("Sending to AWS Bedrock (Claude 3) for translation...", file=sys.stderr)
+    # Parse -> Translate (Bedrock) -> Reconstruct, all in memory
+    stage_messages = {
+        "parse": f"Parsing {args.docx_file}...",
+        "translate": "Sending to AWS Bedrock (Claude 3) for translation...",
+        "reconstruct": "Reconstructing Word document...",
+    }
+    current = {"stage": "parse"}
+
+    def progress(stage):
+        current["stage"] = stage
+        print(stage_messages[stage], file=sys.stderr)
+
+    translate_kwargs = {}
+    if args.stream:
+        done = {"count": 0}
+        done_lock = threading.Lock()
+
+        def on_paragraph(item):
+            with done_lock:
+                done["count"] += 1
+                print(f"  [{done['count']}] {item['id']} translated", file=sys.stderr)
+
+        translate_kwargs = {"stream": True, "on_paragraph": on_paragraph}
+
+    checkpoint_path = args.checkpoint or f"{args.output_json}.checkpoint.jsonl"
+    has_checkpoint = os.path.exists(checkpoint_path) and os.path.getsize(checkpoint_path) > 0
+    if args.resume and not has_checkpoint:
+        print(f"No checkpoint found at {checkpoint_path}, starting from scratch", file=sys.stderr)
+    elif has_checkpoint and not args.resume and not args.overwrite_checkpoint:
+        # Opening without resume truncates the journal; never discard finished batches silently
+        print(f"Error: {checkpoint_path} holds batches from an unfinished run; "
+              f"rerun with --resume to reuse them or --overwrite_checkpoint to discard them", file=sys.stderr)
+        sys.exit(1)
+    checkpoint = CheckpointJournal(checkpoint_path, resume=args.resume)
+
+    metrics = RunMetrics(args.metrics, document=os.path.basename(args.docx_file))
     try:
-        translated_data = translate_segments(parsed_data, glossary=glossary, context_info=context_info)
-        if not translated_data:
-            print("Translation returned no data.", file=sys.stderr)
-            sys.exit(1)
+        output_bytes, translated_data = translate_docx(args.docx_file, glossary=glossary,
+                                                       context_info=context_info, progress=progress,
+                                                       previous=previous, metrics=metrics, checkpoint=checkpoint,
+                                                       normalize=args.normalize_runs, **translate_kwargs)
     except Exception as e:
-        print(f"Translation failed: {e}", file=sys.stderr)
+        print(f"{current['stage'].capitalize()} failed: {e}", file=sys.stderr)
+        print(f"Finished batches are kept in {checkpoint_path}; rerun with --resume", file=sys.stderr)
+        checkpoint.close()
+        metrics.close()
         sys.exit(1)
         
     # Save JSON
     with open(args.output_json, "w", encoding="utf-8") as f:
         json.dump(translated_data, f, indent=2, ensure_ascii=False)
     print(f"Intermediate JSON saved to {args.output_json}", file=sys.stderr)
-    
-    # 3. Reconstruct
-    print("Reconstructing Word document...", file=sys.stderr)
-    try:
-        reconstruct_docx(args.docx_file, args.output_json, args.output_docx)
-    except Exception as e:
-        print(f"Reconstruction failed: {e}", file=sys.stderr)
-        sys.exit(1)
+
+    with open(args.output_docx, "wb") as f:
+        f.write(output_bytes)
         
     print(f"Done! Translated document saved to {args.output_docx}", file=sys.stderr)
+    checkpoint.close(remove=True)
+
+    summary = metrics.close()
+    print(f"Bedrock usage: {format_usage(summary)}", file=sys.stderr)
+    stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in summary["stages"].items())
+    cost = summary["estimated_cost_usd"]
+    print(f"Timing: {stages}; model call latency "
+          f"p50 {summary['batch_latency_s']['p50'] or 0:.2f}s, p95 {summary['batch_latency_s']['p95'] or 0:.2f}s; "
+          f"estimated cost {'unknown' if cost is None else f'${cost:.4f}'}", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# USD per million tokens (input, output), matched by substring of the model ID.
+# Override with BEDROCK_PRICE_INPUT_PER_MTOK / BEDROCK_PRICE_OUTPUT_PER_MTOK.
+MODEL_PRICES = [
+    ("claude-3-opus", (15.0, 75.0)),
+    ("claude-opus-4", (15.0, 75.0)),
+    ("claude-3-5-haiku", (0.8, 4.0)),
+    ("claude-3-haiku", (0.25, 1.25)),
+    ("sonnet", (3.0, 15.0)),
+    ("local-stub", (0.0, 0.0)),
+]
+# Prompt-cache pricing relative to the base input price
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+def model_prices(model_id):
+    """Returns (input, output) USD per million tokens for a model, or None if unknown."""
+    env_in = os.environ.get("BEDROCK_PRICE_INPUT_PER_MTOK")
+    env_out = os.environ.get("BEDROCK_PRICE_OUTPUT_PER_MTOK")
+    if env_in and env_out:
+        return float(env_in), float(env_out)
+    for fragment, prices in MODEL_PRICES:
+        if fragment in (model_id or ""):
+            return prices
+    return None
+
+def estimate_cost(model_id, tokens):
+    """Estimated USD cost of the given token counts, or None if the model's price is unknown."""
+    prices = model_prices(model_id)
+    if prices is None:
+        return None
+    price_in, price_out = prices
+    cost = (tokens.get("input_tokens", 0) * price_in
+            + tokens.get("output_tokens", 0) * price_out
+            + tokens.get("cache_creation_input_tokens", 0) * price_in * CACHE_WRITE_MULTIPLIER
+            + tokens.get("cache_read_input_tokens", 0) * price_in * CACHE_READ_MULTIPLIER)
+    return round(cost / 1_000_000, 6)
+
+def format_usage(summary):
+    """One-line token usage of a RunMetrics summary."""
+    tokens = summary["tokens"]
+    return (f"{summary['batches']} calls, {tokens['input_tokens']} input / {tokens['output_tokens']} output "
+            f"tokens, cache read {tokens['cache_read_input_tokens']} / write {tokens['cache_creation_input_tokens']}")
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[idx], 4)
+
+class RunMetrics:
+    """
+    Structured metrics for one pipeline run, emitted as JSON lines.
+
+    Each event (stage timing, per-batch latency and token usage, cache and
+    dedup counts) is written to `sink` as it happens, and aggregated for
+    summary(). sink may be a path, a text file object, or None to keep the
+    metrics in process only. Safe to use from worker threads.
+    """
+
+    def __init__(self, sink=None, run_id=None, **run_fields):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.run_fields = run_fields
+        self.model_id = run_fields.get("model_id")
+        self._lock = threading.Lock()
+        self._owns_sink = isinstance(sink, str)
+        self._sink = open(sink, "a", encoding="utf-8") if self._owns_sink else sink
+        self.stages = {}
+        self.batch_latencies = []
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.counters = {}
+
+    def emit(self, event, **fields):
+        record = {"ts": round(time.time(), 3), "run_id": self.run_id, "event": event}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            if self._sink is not None:
+                self._sink.write(line + "\n")
+                self._sink.flush()
+        return record
+
+    @contextmanager
+    def stage(self, name):
+        """Times a pipeline stage (parse, translate, reconstruct...)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+            self.emit("stage", stage=name, seconds=round(seconds, 4))
+
+    def record_batch(self, latency, paragraphs, usage=None, stop_reason=None, model_id=None):
+        """Records one model call: wall-clock latency and the response's token usage."""
+        usage = usage or {}
+        if model_id and not self.model_id:
+            self.model_id = model_id
+        with self._lock:
+            self.batch_latencies.append(latency)
+            for field in TOKEN_FIELDS:
+                self.tokens[field] += int(usage.get(field) or 0)
+        self.emit("batch", latency_s=round(latency, 4), paragraphs=paragraphs, stop_reason=stop_reason,
+                  **{field: int(usage.get(field) or 0) for field in TOKEN_FIELDS})
+
+    def count(self, name, value=1, **fields):
+        """Adds to a named counter (e.g. cache_hits) and emits it."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.emit("count", name=name, value=value, **fields)
+
+    def summary(self):
+        """Aggregated view of the run so far."""
+        with self._lock:
+            latencies = list(self.batch_latencies)
+            tokens = dict(self.tokens)
+            stages = {k: round(v, 4) for k, v in self.stages.items()}
+            counters = dict(self.counters)
+        return dict(
+            self.run_fields,
+            run_id=self.run_id,
+            model_id=self.model_id,
+            stages=stages,
+            batches=len(latencies),
+            batch_latency_s={
+                "total": round(sum(latencies), 4),
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "max": round(max(latencies), 4) if latencies else None,
+            },
+            tokens=tokens,
+            counters=counters,
+            estimated_cost_usd=estimate_cost(self.model_id, tokens),
+        )
+
+    def close(self):
+        """Emits the summary record and closes the sink if this object opened it."""
+        summary = self.summary()
+        self.emit("summary", **summary)
+        if self._owns_sink and self._sink is not None:
+            self._sink.close()
+            self._sink = None
+        return summary
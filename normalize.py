@@ -0,0 +1,145 @@
+import os
+import sys
+import zipfile
+from lxml import etree
+from reconstructor import copy_member, serialize_part
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W = f"{{{W_NS}}}"
+TAG_R = f"{W}r"
+TAG_RPR = f"{W}rPr"
+TAG_T = f"{W}t"
+TAG_DEL_TEXT = f"{W}delText"
+TAG_PROOF_ERR = f"{W}proofErr"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Revision-save IDs: Word writes them on every edit session and never needs them to render
+RSID_ATTRS = {f"{W}{name}" for name in (
+    "rsidR", "rsidRPr", "rsidRDefault", "rsidP", "rsidDel", "rsidSect", "rsidTr",
+)}
+TEXT_TAGS = (TAG_T, TAG_DEL_TEXT)
+
+def normalize_enabled(normalize=None):
+    """Resolves a normalize argument; None means the DOCX_NORMALIZE_RUNS setting."""
+    if normalize is None:
+        return os.environ.get("DOCX_NORMALIZE_RUNS", "0") == "1"
+    return bool(normalize)
+
+def _text_run_kind(run):
+    """
+    Returns (properties key, text tag) if the run holds nothing but optional
+    properties and text of one kind (w:t or w:delText), else None.
+    """
+    props = ()
+    text_tag = None
+    for child in run:
+        tag = child.tag
+        if tag == TAG_RPR:
+            # Cheaper than serializing the rPr, and just as exact
+            props = tuple((el.tag, tuple(el.attrib.items()), el.text) for el in child.iter())
+        elif tag in TEXT_TAGS and (text_tag is None or text_tag == tag):
+            text_tag = tag
+        else:
+            return None
+    if not text_tag:
+        return None
+    return (tuple(run.attrib.items()) if run.attrib else (), props), text_tag
+
+def _merge_runs(group, text_tag):
+    """Moves the text of group[1:] into the last text node of group[0] and removes those runs."""
+    first = group[0]
+    last = [child for child in first if child.tag == text_tag][-1]
+    parts = [last.text or ""]
+    for run in group[1:]:
+        parts.extend(child.text or "" for child in run if child.tag == text_tag)
+        first.getparent().remove(run)
+    text = "".join(parts)
+    last.text = text
+    if text != text.strip():
+        last.set(XML_SPACE, "preserve")
+
+def normalize_tree(root):
+    """
+    Shrinks a WordprocessingML part in place without changing its text:
+    drops rsid attributes and w:proofErr markers, then merges adjacent runs
+    whose properties are identical and that contain only text.
+
+    Paragraphs are never added or removed, so positional paragraph IDs and
+    content hashes are the same before and after.
+
+    Returns:
+        dict: element and run counts before and after, proofErr markers removed.
+    """
+    ns = {"w": W_NS}
+    stats = {
+        "nodes_before": int(root.xpath("count(//*)")),
+        "runs_before": int(root.xpath("count(//w:r)", namespaces=ns)),
+        "proof_errors_removed": int(root.xpath("count(//w:proofErr)", namespaces=ns)),
+    }
+    # Both run inside libxml2, without a Python proxy per node
+    etree.strip_attributes(root, *RSID_ATTRS)
+    etree.strip_elements(root, TAG_PROOF_ERR, with_tail=False)
+
+    merged = 0
+    # Parents of runs (paragraphs, hyperlinks, w:ins...), found without an XPath predicate,
+    # which libxml2 evaluates far more slowly than a tag-filtered iter()
+    for parent in dict.fromkeys(run.getparent() for run in root.iter(TAG_R)):
+        run = parent.find(TAG_R)
+        while run is not None:
+            nxt = run.getnext()
+            kind = _text_run_kind(run) if nxt is not None and nxt.tag == TAG_R else None
+            group = [run]
+            while kind is not None and nxt is not None and nxt.tag == TAG_R and _text_run_kind(nxt) == kind:
+                group.append(nxt)
+                nxt = nxt.getnext()
+            if len(group) > 1:
+                _merge_runs(group, kind[1])
+                merged += len(group) - 1
+            while nxt is not None and nxt.tag != TAG_R:
+                nxt = nxt.getnext()
+            run = nxt
+
+    stats["runs_after"] = stats["runs_before"] - merged
+    stats["nodes_after"] = int(root.xpath("count(//*)"))
+    return stats
+
+def format_stats(stats):
+    """One-line summary of a normalize_tree result (plus bytes_before/after if present)."""
+    line = (f"runs {stats['runs_before']} -> {stats['runs_after']}, "
+            f"nodes {stats['nodes_before']} -> {stats['nodes_after']}")
+    if "bytes_before" in stats:
+        saved = 1 - stats["bytes_after"] / stats["bytes_before"] if stats["bytes_before"] else 0
+        line += f", XML {stats['bytes_before']} -> {stats['bytes_after']} bytes ({saved:.0%} smaller)"
+    return line
+
+def normalize_part(xml_bytes):
+    """Parses, normalizes and re-serializes one part; returns (new XML bytes, stats with byte sizes)."""
+    root = etree.fromstring(xml_bytes)
+    stats = normalize_tree(root)
+    normalized = serialize_part(root)
+    stats["bytes_before"] = len(xml_bytes)
+    stats["bytes_after"] = len(normalized)
+    return normalized, stats
+
+def normalize_package(input_docx, output_docx, part_name='word/document.xml'):
+    """
+    Writes a copy of the docx with part_name normalized and returns the stats
+    (including XML bytes before/after). Paths or binary file-like objects.
+    """
+    with zipfile.ZipFile(input_docx) as zin:
+        normalized, stats = normalize_part(zin.read(part_name))
+        with zipfile.ZipFile(output_docx, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                if info.filename == part_name:
+                    zout.writestr(info.filename, normalized)
+                else:
+                    copy_member(zin, zout, info)
+    return stats
+
+if __name__ == "__main__":
+    # python normalize.py input.docx output.docx
+    if len(sys.argv) != 3 or not os.path.exists(sys.argv[1]):
+        print("Usage: python normalize.py <input.docx> <output.docx>", file=sys.stderr)
+        sys.exit(1)
+    result = normalize_package(sys.argv[1], sys.argv[2])
+    print(f"Normalized {sys.argv[1]}: {format_stats(result)}", file=sys.stderr)
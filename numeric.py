@@ -0,0 +1,135 @@
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+# Implements the mechanical rules of REQUIREMENTS.md §4.3 locally so the model
+# never has to convert amounts token by token:
+#   ▲100 -> (100), yen -> millions of yen, 万/億/兆 scaling, thousands separators.
+
+DIGIT = "[0-9０-９]"
+NUM = rf"{DIGIT}{{1,3}}(?:[,，]{DIGIT}{{3}})+(?:[.．]{DIGIT}+)?|{DIGIT}+(?:[.．]{DIGIT}+)?"
+NEG = "[▲△]"
+
+AMOUNT_RE = re.compile(
+    rf"(?:(?P<neg>{NEG})\s*)?"
+    r"(?:"
+    rf"(?P<big>(?:(?:{NUM})\s*[兆億万]\s*)+(?:{NUM})?)\s*(?P<big_unit>百万|千)?円"   # 1兆2,000億円, 3億5,000万円
+    rf"|(?P<plain>{NUM})\s*(?P<unit>百万|千)?円"                                   # 1,234百万円, 500千円, 1,000円
+    rf"|[¥￥]\s*(?P<yen>{NUM})"                                                    # ¥1,000
+    r")"
+    rf"|(?P<bare_neg>{NEG})\s*(?P<bare>{NUM})"                                     # ▲100 (no unit)
+)
+BIG_PART_RE = re.compile(rf"({NUM})\s*([兆億万])|({NUM})$")
+
+PLACEHOLDER_FORMAT = "⟦N{}⟧"
+PLACEHOLDER_RE = re.compile(r"⟦N(\d+)⟧")
+
+FULLWIDTH = str.maketrans("０１２３４５６７８９，．", "0123456789,.")
+MULTIPLIERS = {
+    "兆": Decimal(10) ** 12,
+    "億": Decimal(10) ** 8,
+    "万": Decimal(10) ** 4,
+    "百万": Decimal(10) ** 6,
+    "千": Decimal(10) ** 3,
+    None: Decimal(1),
+}
+MILLION = Decimal(10) ** 6
+DECIMAL_PLACES = Decimal("0.001")
+# Smallest amount 0.001 million yen can show; anything below is left in yen
+MIN_CONVERTED_YEN = MILLION * DECIMAL_PLACES
+# EPS, dividends per share etc. are disclosed in yen, not millions
+PER_SHARE_RE = re.compile(r"株当たり|per\s+share", re.IGNORECASE)
+
+def _to_decimal(num):
+    return Decimal(num.translate(FULLWIDTH).replace(",", ""))
+
+def format_millions(yen):
+    """Formats a yen amount in millions: thousands separators, at most 3 decimal places."""
+    millions = (yen / MILLION).quantize(DECIMAL_PLACES, rounding=ROUND_HALF_UP)
+    if millions == millions.to_integral_value():
+        return f"{int(millions):,}"
+    whole, frac = f"{millions:,.3f}".split(".")
+    return f"{whole}.{frac.rstrip('0')}"
+
+def _wrap_negative(text, negative):
+    return f"({text})" if negative else text
+
+def convert_amount(match):
+    """
+    Converts one AMOUNT_RE match to its English rendering, or returns None if
+    the amount cannot be shown in millions of yen (fractional yen, or less
+    than 0.001 million) and must stay as written.
+    """
+    if match.group("bare") is not None:
+        # No unit: only the sign convention applies.
+        digits = match.group("bare").translate(FULLWIDTH)
+        return f"({digits})"
+
+    negative = match.group("neg") is not None
+    if match.group("big") is not None:
+        yen = Decimal(0)
+        for part in BIG_PART_RE.finditer(match.group("big").strip()):
+            if part.group(1) is not None:
+                yen += _to_decimal(part.group(1)) * MULTIPLIERS[part.group(2)]
+            elif part.group(3) is not None:
+                yen += _to_decimal(part.group(3)) * MULTIPLIERS[match.group("big_unit")]
+    elif match.group("plain") is not None:
+        yen = _to_decimal(match.group("plain")) * MULTIPLIERS[match.group("unit")]
+    else:
+        yen = _to_decimal(match.group("yen"))
+    if yen != yen.to_integral_value() or yen < MIN_CONVERTED_YEN:
+        return None
+    return f"{_wrap_negative(format_millions(yen), negative)} million yen"
+
+def protect_amounts(paragraphs):
+    """
+    Replaces every convertible amount in each paragraph's text with a
+    placeholder. Amounts after a per-share mention (1株当たり) and those
+    convert_amount rejects stay in the text for the model to render.
+
+    Returns (protected, amounts): protected is a list of shallow paragraph copies
+    whose text carries placeholders (paragraphs without amounts are returned
+    as-is), and amounts maps paragraph ID -> list of converted English amounts,
+    indexed by placeholder number - 1.
+    """
+    protected = []
+    amounts = {}
+    for para in paragraphs:
+        text = para.get("text", "")
+        converted = []
+
+        def _sub(match):
+            is_yen = match.group("bare") is None
+            if is_yen and PER_SHARE_RE.search(text, 0, match.start()):
+                return match.group(0)
+            amount = convert_amount(match)
+            if amount is None:
+                return match.group(0)
+            converted.append(amount)
+            return PLACEHOLDER_FORMAT.format(len(converted))
+
+        new_text = AMOUNT_RE.sub(_sub, text) if text else text
+        if converted:
+            amounts[para.get("id")] = converted
+            protected.append(dict(para, text=new_text))
+        else:
+            protected.append(para)
+    return protected, amounts
+
+def restore_amounts(text, converted):
+    """
+    Substitutes converted amounts back into translated text.
+    Returns (text, missing) where missing lists amounts whose placeholder the
+    model dropped.
+    """
+    used = set()
+
+    def _sub(match):
+        idx = int(match.group(1)) - 1
+        if 0 <= idx < len(converted):
+            used.add(idx)
+            return converted[idx]
+        return match.group(0)
+
+    restored = PLACEHOLDER_RE.sub(_sub, text or "")
+    missing = [amount for idx, amount in enumerate(converted) if idx not in used]
+    return restored, missing
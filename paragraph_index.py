@@ -0,0 +1,89 @@
+import hashlib
+import re
+import sys
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+TAG_P = f"{{{W_NS}}}p"
+TAG_T = f"{{{W_NS}}}t"
+
+PARA_ID_RE = re.compile(r"^para_(\d+)$")
+PART_SEPARATOR = ":"
+
+def format_paragraph_id(position, part=None):
+    """
+    Positional paragraph ID (document order of //w:p). Widens past para_999 as needed.
+    Paragraphs of other story parts are qualified with the part, e.g. header1:para_002.
+    """
+    pid = f"para_{position:03d}"
+    return f"{part}{PART_SEPARATOR}{pid}" if part else pid
+
+def split_paragraph_id(pid):
+    """Returns (part, local ID); part is None for paragraphs of document.xml."""
+    part, _, local_id = (pid or "").rpartition(PART_SEPARATOR)
+    return part or None, local_id
+
+def story_part_path(part):
+    """Zip path of a story part: None -> word/document.xml, 'header1' -> word/header1.xml."""
+    return f"word/{part or 'document'}.xml"
+
+def parse_paragraph_id(pid):
+    """Returns the document position encoded in a paragraph ID, or None if it is not positional."""
+    match = PARA_ID_RE.match(pid or "")
+    return int(match.group(1)) if match else None
+
+def content_hash(text):
+    """Short, stable hash of a paragraph's source text, used to re-identify it across re-parses."""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+def own_text_nodes(p):
+    """The paragraph's w:t elements, excluding those of paragraphs nested in it (text boxes)."""
+    return [t for t in p.iter(TAG_T) if next(t.iterancestors(TAG_P), None) is p]
+
+def paragraph_text(p):
+    """Concatenated w:t text of a paragraph, matching parser.parse_document's 'text' field."""
+    return "".join(t.text for t in own_text_nodes(p) if t.text)
+
+class ParagraphIndex:
+    """
+    Index of every w:p in a document tree, built with one pass over the tree.
+    Resolves positional IDs to elements and, when a content hash is supplied,
+    verifies the match and falls back to the nearest paragraph with that hash
+    if the positions have shifted.
+    """
+
+    def __init__(self, root):
+        self.elements = list(root.iter(TAG_P))
+        self._by_hash = None
+
+    def __len__(self):
+        return len(self.elements)
+
+    def _hash_positions(self):
+        if self._by_hash is None:
+            self._by_hash = {}
+            for pos, p in enumerate(self.elements):
+                self._by_hash.setdefault(content_hash(paragraph_text(p)), []).append(pos)
+        return self._by_hash
+
+    def resolve(self, pid, expected_hash=None):
+        """
+        Returns the w:p element for a paragraph ID, or None if it cannot be
+        resolved. Call this for all IDs before modifying any paragraph text,
+        because hashes are computed from the current tree.
+        """
+        position = parse_paragraph_id(pid)
+        if position is not None and position < len(self.elements):
+            p = self.elements[position]
+            if expected_hash is None or content_hash(paragraph_text(p)) == expected_hash:
+                return p
+        if expected_hash is None:
+            return None
+
+        candidates = self._hash_positions().get(expected_hash)
+        if not candidates:
+            print(f"Paragraph {pid} not found in document (content changed?); skipping", file=sys.stderr)
+            return None
+        if position is None:
+            return self.elements[candidates[0]]
+        nearest = min(candidates, key=lambda pos: abs(pos - position))
+        return self.elements[nearest]
@@ -1,13 +1,29 @@
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from lxml import etree
+from paragraph_index import content_hash, format_paragraph_id, story_part_path
 import json
 import os
+import re
 import sys
 
 NAMESPACES = {
     'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
 }
 
+W = f"{{{NAMESPACES['w']}}}"
+TAG_P = f"{W}p"
+TAG_T = f"{W}t"
+TAG_INS = f"{W}ins"
+TAG_DEL = f"{W}del"
+TAG_DEL_TEXT = f"{W}delText"
+TAG_COMMENT_REF = f"{W}commentReference"
+ATTR_ID = f"{W}id"
+ATTR_AUTHOR = f"{W}author"
+
+# Story parts translated besides document.xml; the name doubles as the paragraph ID prefix
+STORY_PART_RE = re.compile(r"^word/((?:header|footer)\d*|footnotes|endnotes)\.xml$")
+
 def get_xml_tree(docx_path, filename):
     """Extracts XML from the docx (zip) file."""
     with zipfile.ZipFile(docx_path) as z:
@@ -16,17 +32,15 @@ def get_xml_tree(docx_path, filename):
             return etree.fromstring(xml_content)
     return None
 
-def parse_comments(docx_path):
-    """Parses comments.xml and returns a dict mapping comment ID to detail."""
+def comments_from_tree(root):
+    """Builds the comment ID -> detail map from a parsed comments.xml root."""
     comments_map = {}
-    root = get_xml_tree(docx_path, 'word/comments.xml')
-    
     if root is None:
         return comments_map
 
     for comment in root.xpath('//w:comment', namespaces=NAMESPACES):
-        comment_id = comment.get(f"{{{NAMESPACES['w']}}}id")
-        author = comment.get(f"{{{NAMESPACES['w']}}}author")
+        comment_id = comment.get(ATTR_ID)
+        author = comment.get(ATTR_AUTHOR)
         
         # Extract text parts
         text_parts = comment.xpath('.//w:t/text()', namespaces=NAMESPACES)
@@ -41,97 +55,224 @@ def parse_comments(docx_path):
             
     return comments_map
 
-def parse_document(docx_path):
-    """Parses document.xml for paragraphs, comments, and track changes."""
-    paragraphs_data = []
-    comments_map = parse_comments(docx_path)
-    
-    root = get_xml_tree(docx_path, 'word/document.xml')
-    if root is None:
-        raise ValueError("Could not find word/document.xml in the file")
+def parse_comments(docx_path):
+    """Parses comments.xml and returns a dict mapping comment ID to detail."""
+    return comments_from_tree(get_xml_tree(docx_path, 'word/comments.xml'))
+
+def scan_paragraph(p):
+    """
+    Collects text, insertions, deletions and comment reference IDs of a w:p in
+    one depth-first walk (instead of one descendant XPath query per feature).
 
-    paras = root.xpath('//w:p', namespaces=NAMESPACES)
+    Returns (text, revisions, comment_ref_ids). Semantics match the XPath form:
+    text is every w:t below the paragraph (so text inside w:ins is included and
+    w:delText is not), and revisions list all insertions before all deletions.
+    Paragraphs nested inside (text box content) are skipped: they are records
+    of their own.
+    """
+    text_parts = []
+    inserts = []
+    deletes = []
+    open_ins = []
+    open_del = []
+    comment_ref_ids = []
+
+    walker = etree.iterwalk(p, events=("start", "end"))
+    for event, el in walker:
+        tag = el.tag
+        if event == "start":
+            if tag == TAG_P and el is not p:
+                walker.skip_subtree()
+            elif tag == TAG_T:
+                if el.text:
+                    text_parts.append(el.text)
+                    for rec in open_ins:
+                        rec["parts"].append(el.text)
+            elif tag == TAG_DEL_TEXT:
+                if el.text:
+                    for rec in open_del:
+                        rec["parts"].append(el.text)
+            elif tag == TAG_INS:
+                rec = {"type": "insert", "author": el.get(ATTR_AUTHOR), "parts": [], "id": el.get(ATTR_ID)}
+                inserts.append(rec)
+                open_ins.append(rec)
+            elif tag == TAG_DEL:
+                rec = {"type": "delete", "author": el.get(ATTR_AUTHOR), "parts": [], "id": el.get(ATTR_ID)}
+                deletes.append(rec)
+                open_del.append(rec)
+            elif tag == TAG_COMMENT_REF:
+                comment_ref_ids.append(el.get(ATTR_ID))
+        elif tag == TAG_INS:
+            open_ins.pop()
+        elif tag == TAG_DEL:
+            open_del.pop()
+
+    revisions = [
+        {"type": rec["type"], "author": rec["author"], "text": "".join(rec["parts"]), "id": rec["id"]}
+        for rec in inserts + deletes
+    ]
+    return "".join(text_parts), revisions, comment_ref_ids
+
+def build_paragraph_record(index, p, comments_map, part=None):
+    """
+    Builds the paragraph object for the w:p at document position `index`
+    (within `part`, None for document.xml), or returns None if it has no
+    text, revisions or comments.
+    """
+    # 1. Text, 2. Revisions (Track Changes) and 3. comment references in one walk.
+    # Text is the contents of all w:t, which includes added text (w:ins/w:r/w:t)
+    # but not deleted text (w:del contains w:delText, which is not in w:t).
+    para_text, revisions, comment_ref_ids = scan_paragraph(p)
+
+    current_para_comments = []
+    seen_comment_ids = set()
     
-    for i, p in enumerate(paras):
-        # 1. Extract plain text (including text inside inserts, generally document.xml plain text view)
-        # Note: getting text from w:t directly captures current state (after inserts, before deletes usually?)
-        # Detailed revision handling (w:ins/w:del) needs careful traversal.
-        
-        # Simple extraction for "text" field: contents of all w:t
-        # This includes added text (w:ins/w:r/w:t) but might exclude deleted text depending on how Word saves it.
-        # Usually w:del contains w:delText which is not in w:t.
-        text_parts = p.xpath('.//w:t/text()', namespaces=NAMESPACES)
-        para_text = "".join(text_parts)
-        
-        # 2. Revisions (Track Changes)
-        # Look for w:ins and w:del
-        revisions = []
-        
-        # Insertions
-        inserts = p.xpath('.//w:ins', namespaces=NAMESPACES)
-        for ins in inserts:
-            ins_id = ins.get(f"{{{NAMESPACES['w']}}}id")
-            author = ins.get(f"{{{NAMESPACES['w']}}}author")
-            # Text inside insert
-            ins_text = "".join(ins.xpath('.//w:t/text()', namespaces=NAMESPACES))
-            revisions.append({
-                "type": "insert",
-                "author": author,
-                "text": ins_text,
-                "id": ins_id
-            })
-            
-        # Deletions
-        deletes = p.xpath('.//w:del', namespaces=NAMESPACES)
-        for dl in deletes:
-            dl_id = dl.get(f"{{{NAMESPACES['w']}}}id")
-            author = dl.get(f"{{{NAMESPACES['w']}}}author")
-            # Text inside delete (usually w:delText)
-            del_text = "".join(dl.xpath('.//w:delText/text()', namespaces=NAMESPACES))
-            revisions.append({
-                "type": "delete",
-                "author": author,
-                "text": del_text,
-                "id": dl_id
-            })
-            
-        # 3. Comments
-        # We look for comment references: <w:commentReference w:id="X"/>
-        comment_refs = p.xpath('.//w:commentReference', namespaces=NAMESPACES)
-        current_para_comments = []
-        seen_comment_ids = set()
-        
-        for ref in comment_refs:
-            c_id = ref.get(f"{{{NAMESPACES['w']}}}id")
-            if c_id and c_id in comments_map and c_id not in seen_comment_ids:
-                current_para_comments.append(comments_map[c_id])
-                seen_comment_ids.add(c_id)
-
-        # Build paragraph object
-        if para_text.strip() or revisions or current_para_comments:
-            para_obj = {
-                "id": f"para_{i:03d}",
-                "text": para_text,
-                "comments": current_para_comments,
-                "revisions": revisions
-            }
-            paragraphs_data.append(para_obj)
+    for c_id in comment_ref_ids:
+        if c_id and c_id in comments_map and c_id not in seen_comment_ids:
+            current_para_comments.append(comments_map[c_id])
+            seen_comment_ids.add(c_id)
+
+    if para_text.strip() or revisions or current_para_comments:
+        return {
+            "id": format_paragraph_id(index, part),
+            "hash": content_hash(para_text),
+            "text": para_text,
+            "comments": current_para_comments,
+            "revisions": revisions
+        }
+    return None
+
+def story_parts_enabled(story_parts=None):
+    """Resolves a story_parts argument; None means the DOCX_STORY_PARTS setting (on by default)."""
+    if story_parts is None:
+        return os.environ.get("DOCX_STORY_PARTS", "1") == "1"
+    return bool(story_parts)
+
+def find_story_parts(names):
+    """Header, footer, footnote and endnote part names (e.g. 'header1') present in a zip listing."""
+    parts = [m.group(1) for m in map(STORY_PART_RE.match, names) if m]
+    return sorted(parts, key=lambda part: (re.sub(r"\d+$", "", part), len(part), part))
+
+def part_records(root, part, comments_map):
+    """Returns the paragraph records of one parsed story part."""
+    records = []
+    for i, p in enumerate(root.iter(TAG_P)):
+        para_obj = build_paragraph_record(i, p, comments_map, part)
+        if para_obj is not None:
+            records.append(para_obj)
+    return records
+
+def parse_story_parts(z, parts, comments_map):
+    """
+    Parses several story parts of an open zip; returns their records in part
+    order. Part bytes are read up front (zip reads are not thread-safe) and
+    parsed on a thread pool, where lxml releases the GIL. Building the records
+    holds the GIL, so that runs afterwards, one part at a time.
+    """
+    raw = [z.read(story_part_path(part)) for part in parts]
+    if len(raw) <= 1:
+        roots = [etree.fromstring(xml_bytes) for xml_bytes in raw]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(raw), os.cpu_count() or 1)) as pool:
+            roots = list(pool.map(etree.fromstring, raw))
+    records = []
+    for root, part in zip(roots, parts):
+        records.extend(part_records(root, part, comments_map))
+    return records
+
+def parse_document(docx_path, story_parts=None):
+    """
+    Parses document.xml for paragraphs, comments, and track changes.
+
+    With story_parts (default: DOCX_STORY_PARTS, on), headers, footers,
+    footnotes and endnotes are parsed too, in parallel; their paragraph IDs
+    are qualified with the part (e.g. footnotes:para_003) and their records
+    follow the document's. Text boxes are reached through their w:p in
+    whichever part anchors them.
+    """
+    with zipfile.ZipFile(docx_path) as z:
+        names = set(z.namelist())
+        if 'word/document.xml' not in names:
+            raise ValueError("Could not find word/document.xml in the file")
+        comments_root = etree.fromstring(z.read('word/comments.xml')) if 'word/comments.xml' in names else None
+        comments_map = comments_from_tree(comments_root)
+        parts = [None] + (find_story_parts(names) if story_parts_enabled(story_parts) else [])
+        paragraphs_data = parse_story_parts(z, parts, comments_map)
 
     return {"paragraphs": paragraphs_data}
 
+def iter_paragraphs(docx_path, story_parts=None):
+    """
+    Streaming counterpart of parse_document: yields the same paragraph records,
+    in the same order and with the same IDs, while parsing word/document.xml
+    incrementally with iterparse. Processed elements are cleared as soon as
+    their outermost paragraph closes, so memory stays flat with document size.
+    Story parts (small next to the body) are parsed whole, after the body.
+    """
+    with zipfile.ZipFile(docx_path) as z:
+        names = set(z.namelist())
+        if 'word/document.xml' not in names:
+            raise ValueError("Could not find word/document.xml in the file")
+        comments_root = None
+        if 'word/comments.xml' in names:
+            comments_root = etree.fromstring(z.read('word/comments.xml'))
+        comments_map = comments_from_tree(comments_root)
+        del comments_root
+
+        with z.open('word/document.xml') as stream:
+            next_index = 0
+            open_paras = []    # document-order indexes of w:p currently open
+            finished = {}      # index -> record (or None) awaiting in-order emit
+            emit_index = 0
+
+            for event, el in etree.iterparse(stream, events=("start", "end"), tag=TAG_P):
+                if event == "start":
+                    open_paras.append(next_index)
+                    next_index += 1
+                    continue
+
+                # Nested paragraphs (text boxes) close before their container,
+                # so records are buffered and emitted in start (= //w:p) order.
+                index = open_paras.pop()
+                finished[index] = build_paragraph_record(index, el, comments_map)
+                while emit_index in finished:
+                    record = finished.pop(emit_index)
+                    emit_index += 1
+                    if record is not None:
+                        yield record
+
+                # Clearing inside an enclosing paragraph would drop its earlier runs.
+                if not open_paras:
+                    el.clear()
+                    for ancestor in el.iterancestors():
+                        while ancestor.getprevious() is not None:
+                            del ancestor.getparent()[0]
+                    while el.getprevious() is not None:
+                        del el.getparent()[0]
+
+        if story_parts_enabled(story_parts):
+            yield from parse_story_parts(z, find_story_parts(names), comments_map)
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python parser.py <path_to_docx>")
+    # python parser.py <path_to_docx> [--jsonl]
+    # --jsonl streams one record per line via iter_paragraphs, in flat memory
+    args = [arg for arg in sys.argv[1:] if arg != "--jsonl"]
+    if len(args) != 1:
+        print("Usage: python parser.py <path_to_docx> [--jsonl]")
         sys.exit(1)
     
-    docx_file = sys.argv[1]
+    docx_file = args[0]
     if not os.path.exists(docx_file):
         print(f"Error: File not found: {docx_file}")
         sys.exit(1)
         
     try:
-        data = parse_document(docx_file)
-        print(json.dumps(data, indent=2, ensure_ascii=False))
+        if "--jsonl" in sys.argv[1:]:
+            for record in iter_paragraphs(docx_file):
+                print(json.dumps(record, ensure_ascii=False))
+        else:
+            data = parse_document(docx_file)
+            print(json.dumps(data, indent=2, ensure_ascii=False))
     except Exception as e:
         print(f"Error parsing document: {e}", file=sys.stderr)
         sys.exit(1)
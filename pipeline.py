@@ -0,0 +1,107 @@
+import contextlib
+import io
+import sys
+from parser import parse_document
+from translator import translate_segments
+from incremental import translate_incremental
+from reconstructor import reconstruct_package
+from normalize import format_stats, normalize_enabled, normalize_package
+
+def as_binary_file(docx):
+    """Accepts docx content as bytes, a file-like object or a path; returns something zipfile can open."""
+    if isinstance(docx, (bytes, bytearray, memoryview)):
+        return io.BytesIO(bytes(docx))
+    if hasattr(docx, "getvalue"):
+        return io.BytesIO(docx.getvalue())
+    return docx
+
+def normalize_bytes(docx):
+    """Returns (normalized docx bytes, normalize stats)."""
+    output = io.BytesIO()
+    stats = normalize_package(as_binary_file(docx), output)
+    return output.getvalue(), stats
+
+def parse_docx(docx):
+    return parse_document(as_binary_file(docx))
+
+def reconstruct_bytes(docx, translated_data):
+    """Returns the translated docx as bytes."""
+    source = as_binary_file(docx)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    output = io.BytesIO()
+    reconstruct_package(source, translated_data, output)
+    return output.getvalue()
+
+def _call(fn, *args):
+    return fn(*args)
+
+def translate_docx(docx, glossary=None, context_info=None, progress=None, previous=None, metrics=None,
+                   on_parsed=None, normalize=None, run_stage=None, **translate_kwargs):
+    """
+    Runs parse -> translate -> reconstruct entirely in memory.
+
+    Args:
+        docx: Original document as bytes, a binary file-like object or a path.
+        glossary (dict, optional): Dictionary of "Term": "Translation".
+        context_info (dict, optional): Metadata like project_name, member_names, etc.
+        progress (callable, optional): Called with the stage name
+            ("parse", "translate", "reconstruct") as each stage starts.
+        previous (tuple, optional): (previous docx, previous translation dict) of an
+            earlier draft; only changed or new paragraphs are then sent for translation.
+        metrics (RunMetrics, optional): Records wall time per stage and is passed on
+            to translate_segments for per-batch latency, tokens and cache counts.
+        on_parsed (callable, optional): Called with the parsed data before translation
+            starts (e.g. to size a progress bar; pair with on_paragraph).
+        normalize (bool, optional): Merge fragmented runs and drop rsid noise in
+            document.xml first, so parse and reconstruct walk a smaller tree and the
+            output keeps whole runs (see normalize.py). Defaults to DOCX_NORMALIZE_RUNS.
+        run_stage (callable, optional): run_stage(fn, *args) runs the CPU-bound stages
+            (normalize_bytes, parse_docx, reconstruct_bytes) and returns fn's result;
+            batch mode passes one that runs them in a process pool. Defaults to
+            calling fn directly.
+        **translate_kwargs: Passed through to translate_segments (scheduler, cache, ...).
+
+    Returns:
+        tuple: (output docx bytes, translated data dict)
+    """
+    report = progress or (lambda stage: None)
+    run = run_stage or _call
+    source = docx
+
+    if metrics is None:
+        stage = lambda name: contextlib.nullcontext()
+    else:
+        stage = metrics.stage
+        translate_kwargs["metrics"] = metrics
+
+    report("parse")
+    if normalize_enabled(normalize):
+        with stage("normalize"):
+            source, stats = run(normalize_bytes, source)
+        print(f"Normalized word/document.xml: {format_stats(stats)}", file=sys.stderr)
+        if metrics is not None:
+            metrics.emit("normalize", **stats)
+    with stage("parse"):
+        parsed_data = run(parse_docx, source)
+    if on_parsed is not None:
+        on_parsed(parsed_data)
+
+    report("translate")
+    with stage("translate"):
+        if previous is not None:
+            previous_docx, previous_translation = previous
+            previous_data = run(parse_docx, previous_docx)
+            translated_data = translate_incremental(parsed_data, previous_data, previous_translation,
+                                                    glossary=glossary, context_info=context_info,
+                                                    **translate_kwargs)
+        else:
+            translated_data = translate_segments(parsed_data, glossary=glossary, context_info=context_info,
+                                                 **translate_kwargs)
+    if not translated_data:
+        raise ValueError("Translation returned no data.")
+
+    report("reconstruct")
+    with stage("reconstruct"):
+        output_bytes = run(reconstruct_bytes, source, translated_data)
+    return output_bytes, translated_data
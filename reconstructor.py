@@ -3,9 +3,10 @@ import os
 import random
 import shutil
 import string
-import tempfile
+import sys
 import zipfile
 from lxml import etree
+from paragraph_index import ParagraphIndex, own_text_nodes, split_paragraph_id, story_part_path
 
 NAMESPACES = {
     'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
@@ -15,39 +16,53 @@ REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
 COMMENTS_REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
 COMMENTS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"
 
+DOCUMENT_PART = 'word/document.xml'
+COMMENTS_PART = 'word/comments.xml'
+DOC_RELS_PART = 'word/_rels/document.xml.rels'
+CONTENT_TYPES_PART = '[Content_Types].xml'
+# Formats that deflate cannot shrink further; copied stored instead of re-compressed.
+PRECOMPRESSED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.jpe', '.gif', '.wdp', '.jxr',
+    '.mp3', '.mp4', '.m4a', '.zip', '.docx', '.xlsx', '.pptx',
+}
+COPY_CHUNK_SIZE = 1024 * 1024
+# Story parts besides document.xml that may carry comment anchors
+COMMENTABLE_PARTS = {'footnotes', 'endnotes'}
+
 def generate_id():
     return "".join(random.choices(string.digits, k=5))
 
-def ensure_comments_part(temp_dir):
+def read_part(zin, name):
+    """Parses an XML part from an open zip, or returns None if it is absent."""
+    try:
+        return etree.fromstring(zin.read(name))
+    except KeyError:
+        return None
+
+def serialize_part(root):
+    return etree.tostring(root, encoding='UTF-8', xml_declaration=True, standalone=True)
+
+def ensure_comments_part(zin):
     """
     Ensures comments.xml exists and is referenced from document rels and content types.
-    Returns tuple (comments_tree, comments_root, existing_comment_ids).
+    Returns tuple (comments_root, existing_comment_ids, package_parts) where
+    package_parts maps the rels and [Content_Types].xml part names to their
+    (possibly updated) roots, to be written in place of the originals.
     """
-    comments_xml_path = os.path.join(temp_dir, 'word', 'comments.xml')
-    doc_rels_path = os.path.join(temp_dir, 'word', '_rels', 'document.xml.rels')
-    content_types_path = os.path.join(temp_dir, '[Content_Types].xml')
-
     existing_comment_ids = set()
 
     # Load or create comments.xml
-    if os.path.exists(comments_xml_path):
-        comments_tree = etree.parse(comments_xml_path)
-        comments_root = comments_tree.getroot()
+    comments_root = read_part(zin, COMMENTS_PART)
+    if comments_root is not None:
         for c in comments_root.xpath('//w:comment', namespaces=NAMESPACES):
             existing_comment_ids.add(c.get(f"{{{NAMESPACES['w']}}}id"))
     else:
         comments_root = etree.Element(f"{{{NAMESPACES['w']}}}comments", nsmap=NAMESPACES)
-        comments_tree = etree.ElementTree(comments_root)
-        os.makedirs(os.path.dirname(comments_xml_path), exist_ok=True)
 
     # Ensure relationship from document.xml to comments.xml
-    os.makedirs(os.path.dirname(doc_rels_path), exist_ok=True)
-    if os.path.exists(doc_rels_path):
-        rels_tree = etree.parse(doc_rels_path)
-        rels_root = rels_tree.getroot()
-    else:
+    rels_root = read_part(zin, DOC_RELS_PART)
+    if rels_root is None:
         rels_root = etree.Element("Relationships", nsmap={None: REL_NS})
-        rels_tree = etree.ElementTree(rels_root)
 
     existing_rel = rels_root.xpath(f"./rels:Relationship[@Type='{COMMENTS_REL_TYPE}']",
                                    namespaces={'rels': REL_NS})
@@ -66,16 +81,11 @@ def ensure_comments_part(temp_dir):
         rel_el.set("Type", COMMENTS_REL_TYPE)
         rel_el.set("Target", "comments.xml")
 
-    rels_tree.write(doc_rels_path, encoding='UTF-8', xml_declaration=True, standalone="yes")
-
     # Ensure [Content_Types].xml override for comments
-    if os.path.exists(content_types_path):
-        ct_tree = etree.parse(content_types_path)
-        ct_root = ct_tree.getroot()
-    else:
+    ct_root = read_part(zin, CONTENT_TYPES_PART)
+    if ct_root is None:
         ct_root = etree.Element("Types", nsmap=None)
         ct_root.set("xmlns", "http://schemas.openxmlformats.org/package/2006/content-types")
-        ct_tree = etree.ElementTree(ct_root)
 
     ct_ns = {"ct": "http://schemas.openxmlformats.org/package/2006/content-types"}
     override_xpath = "./ct:Override[@PartName='/word/comments.xml']"
@@ -84,16 +94,33 @@ def ensure_comments_part(temp_dir):
         override.set("PartName", "/word/comments.xml")
         override.set("ContentType", COMMENTS_CONTENT_TYPE)
 
-    ct_tree.write(content_types_path, encoding='UTF-8', xml_declaration=True, standalone="yes")
+    package_parts = {DOC_RELS_PART: rels_root, CONTENT_TYPES_PART: ct_root}
+    return comments_root, existing_comment_ids, package_parts
 
-    return comments_tree, comments_root, existing_comment_ids
+def copy_member(zin, zout, info):
+    """
+    Streams an untouched zip member into the output package. Members that were
+    stored, or whose format is already compressed (images, media, embedded
+    packages), are written stored so they are never deflated again.
+    """
+    out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    out_info.external_attr = info.external_attr
+    out_info.file_size = info.file_size
+    ext = os.path.splitext(info.filename)[1].lower()
+    if info.compress_type == zipfile.ZIP_STORED or ext in PRECOMPRESSED_EXTENSIONS:
+        out_info.compress_type = zipfile.ZIP_STORED
+    else:
+        out_info.compress_type = zipfile.ZIP_DEFLATED
+    with zin.open(info) as src, zout.open(out_info, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
 
 def apply_text_to_runs(paragraph, new_text, color_val=None):
     """
     Replace paragraph text while preserving run structure/styling where possible.
     Splits the new text evenly across existing text nodes; attaches color if provided.
     """
-    text_nodes = paragraph.xpath('.//w:t', namespaces=NAMESPACES)
+    # Text of nested paragraphs (text boxes) belongs to those paragraphs' own translations
+    text_nodes = own_text_nodes(paragraph)
     if not text_nodes:
         return
 
@@ -132,119 +159,153 @@ def apply_text_to_runs(paragraph, new_text, color_val=None):
         new_t.text = remaining
         paragraph.append(new_run)
 
-def reconstruct_docx(original_docx_path, translated_json_path, output_docx_path):
+def apply_translations(root, items, comments_root, existing_comment_ids, allow_comments=True):
+    """
+    Writes translations into one story part (document.xml, a header, footnotes...).
+
+    items are (local paragraph ID, translated item) pairs for this part. AI notes
+    become comments in comments_root unless allow_comments is False (Word does
+    not support comments in headers and footers); the text is still colored.
+    """
+    # Resolve every translated ID up front (hash checks need the untouched
+    # tree), then touch only the paragraphs that actually have translations.
+    index = ParagraphIndex(root)
+    targets = []
+    seen = set()
+    for para_id, item in items:
+        p = index.resolve(para_id, item.get("hash"))
+        if p is None or id(p) in seen:
+            continue
+        seen.add(id(p))
+        targets.append((p, item))
+
+    for p, item in targets:
+        new_text = item.get("translated_text", "")
+        ai_comments = item.get("ai_generated_comments", [])
+        
+        if not new_text:
+            continue
+
+        # Check if we need Red Text (if comments exist, we assume it's "alert" worthy per specs)
+        # or if text has specific markers. The user asked for "confidence" -> red.
+        # We'll treat presence of AI comments as a trigger for Red Text for now, or just default black.
+        # User said: "疑わしい・翻訳に自信のない箇所は赤字" -> implementation detail: 
+        # if `ai_generated_comments` is not empty, we assume there's a warning.
+        
+        is_warning = len(ai_comments) > 0
+        color_val = "FF0000" if is_warning else None
+
+        # --- Text Replacement Strategy ---
+        # Simplified: Clear all runs, add a new single run with the text.
+        # Complex: Try to preserve bold/italic. For prototype, we replace the first run text 
+        # and color it if needed, remove others.
+        
+        text_nodes = own_text_nodes(p)
+        if not text_nodes:
+            continue # Skip empty paragraphs
+            
+        apply_text_to_runs(p, new_text, color_val=color_val)
+
+        # --- Insert Comments ---
+        if ai_comments and allow_comments:
+            for comment_text in ai_comments:
+                c_id = generate_id()
+                while c_id in existing_comment_ids:
+                    c_id = generate_id()
+                existing_comment_ids.add(c_id)
+                
+                # Add to comments.xml
+                # <w:comment w:id="X" ...> ... <w:t>Text</w:t> ... </w:comment>
+                new_comment = etree.Element(f"{{{NAMESPACES['w']}}}comment", nsmap=NAMESPACES)
+                new_comment.set(f"{{{NAMESPACES['w']}}}id", c_id)
+                # Add standard date/author attributes if needed, keep simple for now
+                
+                c_p = etree.SubElement(new_comment, f"{{{NAMESPACES['w']}}}p", nsmap=NAMESPACES)
+                c_r = etree.SubElement(c_p, f"{{{NAMESPACES['w']}}}r", nsmap=NAMESPACES)
+                c_t = etree.SubElement(c_r, f"{{{NAMESPACES['w']}}}t", nsmap=NAMESPACES)
+                c_t.text = f"[AI] {comment_text}"
+                
+                comments_root.append(new_comment)
+                
+                # Link in the story part (document.xml, footnotes...)
+                # Need <w:commentRangeStart>, <w:commentRangeEnd>, <w:commentReference>
+                # This is tricky without messing up XML.
+                # Safest: Insert <w:commentReference> in the run we modified.
+                
+                # Create reference node
+                # <w:r><w:commentReference w:id="X"/></w:r> 
+                # We append this run to the paragraph
+                ref_run = etree.Element(f"{{{NAMESPACES['w']}}}r", nsmap=NAMESPACES)
+                ref_node = etree.Element(f"{{{NAMESPACES['w']}}}commentReference", nsmap=NAMESPACES)
+                ref_node.set(f"{{{NAMESPACES['w']}}}id", c_id)
+                ref_run.append(ref_node)
+                
+                p.append(ref_run)
+
+def reconstruct_package(original_docx, data, output_docx):
     """
     Creates a new docx by replacing text with translations, applying red color for alerts,
     and inserting comments for AI notes.
+
+    original_docx and output_docx may be paths or binary file-like objects;
+    data is the translated dict ({"paragraphs": [...]}) as returned by
+    translate_segments. Part-qualified IDs (e.g. header1:para_002) are
+    written back to their header, footer, footnotes or endnotes part.
     """
-    
-    with open(translated_json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Map para_id to data
+    # Map para_id to data, grouped by story part (None = document.xml)
     trans_map = {p["id"]: p for p in data.get("paragraphs", [])}
+    by_part = {}
+    for para_id, item in trans_map.items():
+        part, local_id = split_paragraph_id(para_id)
+        by_part.setdefault(part, []).append((local_id, item))
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Unzip
-        with zipfile.ZipFile(original_docx_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        doc_xml_path = os.path.join(temp_dir, 'word', 'document.xml')
-        comments_xml_path = os.path.join(temp_dir, 'word', 'comments.xml')
-        
+    with zipfile.ZipFile(original_docx, 'r') as zin:
         # 1. Update comments.xml if ai_generated_comments exist
-        comments_tree, comments_root, existing_comment_ids = ensure_comments_part(temp_dir)
+        comments_root, existing_comment_ids, package_parts = ensure_comments_part(zin)
 
-        # 2. Process Paragraphs
-        doc_tree = etree.parse(doc_xml_path)
-        doc_root = doc_tree.getroot()
-        paras = doc_root.xpath('//w:p', namespaces=NAMESPACES)
-        
-        for i, p in enumerate(paras):
-            para_id = f"para_{i:03d}"
-            if para_id not in trans_map:
+        # 2. Process Paragraphs, part by part
+        doc_root = read_part(zin, DOCUMENT_PART)
+        if doc_root is None:
+            raise ValueError("Could not find word/document.xml in the file")
+        roots = {None: doc_root}
+        for part in by_part:
+            if part is None:
                 continue
-                
-            item = trans_map[para_id]
-            new_text = item.get("translated_text", "")
-            ai_comments = item.get("ai_generated_comments", [])
-            
-            if not new_text:
+            root = read_part(zin, story_part_path(part))
+            if root is None:
+                print(f"Part {story_part_path(part)} not found in document; skipping its paragraphs",
+                      file=sys.stderr)
                 continue
+            roots[part] = root
+        for part, root in roots.items():
+            apply_translations(root, by_part.get(part, []), comments_root, existing_comment_ids,
+                               allow_comments=part is None or part in COMMENTABLE_PARTS)
 
-            # Check if we need Red Text (if comments exist, we assume it's "alert" worthy per specs)
-            # or if text has specific markers. The user asked for "confidence" -> red.
-            # We'll treat presence of AI comments as a trigger for Red Text for now, or just default black.
-            # User said: "疑わしい・翻訳に自信のない箇所は赤字" -> implementation detail: 
-            # if `ai_generated_comments` is not empty, we assume there's a warning.
-            
-            is_warning = len(ai_comments) > 0
-            color_val = "FF0000" if is_warning else None
-
-            # --- Text Replacement Strategy ---
-            # Simplified: Clear all runs, add a new single run with the text.
-            # Complex: Try to preserve bold/italic. For prototype, we replace the first run text 
-            # and color it if needed, remove others.
-            
-            text_nodes = p.xpath('.//w:t', namespaces=NAMESPACES)
-            if not text_nodes:
-                continue # Skip empty paragraphs
-                
-            apply_text_to_runs(p, new_text, color_val=color_val)
+        # Write the package: re-serialize only the parts we changed and
+        # stream every other member straight from the input zip.
+        rewritten = dict(package_parts)
+        for part, root in roots.items():
+            rewritten[story_part_path(part)] = root
+        rewritten[COMMENTS_PART] = comments_root
 
-            # --- Insert Comments ---
-            if ai_comments:
-                for comment_text in ai_comments:
-                    c_id = generate_id()
-                    while c_id in existing_comment_ids:
-                        c_id = generate_id()
-                    existing_comment_ids.add(c_id)
-                    
-                    # Add to comments.xml
-                    # <w:comment w:id="X" ...> ... <w:t>Text</w:t> ... </w:comment>
-                    new_comment = etree.Element(f"{{{NAMESPACES['w']}}}comment", nsmap=NAMESPACES)
-                    new_comment.set(f"{{{NAMESPACES['w']}}}id", c_id)
-                    # Add standard date/author attributes if needed, keep simple for now
-                    
-                    c_p = etree.SubElement(new_comment, f"{{{NAMESPACES['w']}}}p", nsmap=NAMESPACES)
-                    c_r = etree.SubElement(c_p, f"{{{NAMESPACES['w']}}}r", nsmap=NAMESPACES)
-                    c_t = etree.SubElement(c_r, f"{{{NAMESPACES['w']}}}t", nsmap=NAMESPACES)
-                    c_t.text = f"[AI] {comment_text}"
-                    
-                    comments_root.append(new_comment)
-                    
-                    # Link in document.xml
-                    # Need <w:commentRangeStart>, <w:commentRangeEnd>, <w:commentReference>
-                    # This is tricky without messing up XML.
-                    # Safest: Insert <w:commentReference> in the run we modified.
-                    
-                    # Create reference node
-                    # <w:r><w:commentReference w:id="X"/></w:r> 
-                    # We append this run to the paragraph
-                    ref_run = etree.Element(f"{{{NAMESPACES['w']}}}r", nsmap=NAMESPACES)
-                    ref_node = etree.Element(f"{{{NAMESPACES['w']}}}commentReference", nsmap=NAMESPACES)
-                    ref_node.set(f"{{{NAMESPACES['w']}}}id", c_id)
-                    ref_run.append(ref_node)
-                    
-                    p.append(ref_run)
-
-        # Write back XMLs
-        if comments_root is not None:
-            comments_tree.write(comments_xml_path, encoding='UTF-8', xml_declaration=True, standalone="yes")
-        
-        doc_tree.write(doc_xml_path, encoding='UTF-8', xml_declaration=True, standalone="yes")
+        with zipfile.ZipFile(output_docx, 'w', zipfile.ZIP_DEFLATED) as docx_out:
+            for info in zin.infolist():
+                if info.filename in rewritten:
+                    docx_out.writestr(info.filename, serialize_part(rewritten.pop(info.filename)))
+                else:
+                    copy_member(zin, docx_out, info)
+            # Parts that did not exist in the input (e.g. a new comments.xml)
+            for name, root in rewritten.items():
+                docx_out.writestr(name, serialize_part(root))
 
-        # Zip up
-        with zipfile.ZipFile(output_docx_path, 'w', zipfile.ZIP_DEFLATED) as docx_out:
-            for foldername, subfolders, filenames in os.walk(temp_dir):
-                for filename in filenames:
-                    file_path = os.path.join(foldername, filename)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    docx_out.write(file_path, arcname)
+def reconstruct_docx(original_docx_path, translated_json_path, output_docx_path):
+    """File-based wrapper around reconstruct_package that reads the translation JSON from disk."""
+    with open(translated_json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
+    reconstruct_package(original_docx_path, data, output_docx_path)
     print(f"Refined document saved to {output_docx_path}")
 
 if __name__ == "__main__":
-    import sys
     # python reconstructor.py input.docx translation.json output.docx
     reconstruct_docx(sys.argv[1], sys.argv[2], sys.argv[3])
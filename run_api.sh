@@ -0,0 +1,9 @@
+#!/bin/bash
+# Load .env variables just in case, though Python loads them too if using dotenv
+if [ -f .env ]; then
+  export $(cat .env | xargs)
+fi
+
+# Set TRANSLATION_BACKEND=stub to try the API locally without AWS
+echo "Starting Translation API..."
+./venv/bin/python server.py "$@"
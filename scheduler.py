@@ -0,0 +1,110 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Bedrock quota defaults; override per account/model via environment.
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_REQUESTS_PER_MINUTE = 50
+DEFAULT_TOKENS_PER_MINUTE = 200000
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+WINDOW_SECONDS = 60.0
+
+THROTTLING_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+def is_throttling_error(exc):
+    """True if the exception is a Bedrock throttling/capacity error worth retrying."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code in THROTTLING_CODES:
+            return True
+    return type(exc).__name__ in THROTTLING_CODES
+
+class QuotaScheduler:
+    """
+    Runs jobs on a thread pool while keeping a sliding one-minute window under
+    the configured requests-per-minute and tokens-per-minute limits.
+    Jobs that raise a throttling error are retried with exponential backoff.
+    One scheduler may be shared by several callers; max_workers then bounds
+    their combined number of in-flight calls.
+    """
+
+    def __init__(self, max_workers=None, requests_per_minute=None, tokens_per_minute=None, max_retries=None):
+        self.max_workers = max_workers or int(os.environ.get("BEDROCK_MAX_CONCURRENCY", DEFAULT_MAX_WORKERS))
+        self.requests_per_minute = requests_per_minute or int(
+            os.environ.get("BEDROCK_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE))
+        self.tokens_per_minute = tokens_per_minute or int(
+            os.environ.get("BEDROCK_TOKENS_PER_MINUTE", DEFAULT_TOKENS_PER_MINUTE))
+        self.max_retries = max_retries if max_retries is not None else int(
+            os.environ.get("BEDROCK_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self._lock = threading.Lock()
+        self._window = deque()  # (timestamp, tokens)
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+
+    def _window_usage(self, now):
+        while self._window and now - self._window[0][0] >= WINDOW_SECONDS:
+            self._window.popleft()
+        return len(self._window), sum(t for _, t in self._window)
+
+    def acquire(self, tokens):
+        """Blocks until a request of `tokens` fits in the current quota window."""
+        # A single request larger than the whole TPM budget would wait forever.
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                requests, used_tokens = self._window_usage(now)
+                if requests < self.requests_per_minute and used_tokens + tokens <= self.tokens_per_minute:
+                    self._window.append((now, tokens))
+                    return
+                wait = WINDOW_SECONDS - (now - self._window[0][0]) if self._window else 0.1
+            time.sleep(max(wait, 0.05))
+
+    def _run_one(self, fn, tokens, args):
+        attempt = 0
+        while True:
+            # The slot caps in-flight calls across concurrent map() calls (e.g. several documents)
+            with self._slots:
+                self.acquire(tokens)
+                try:
+                    return fn(*args)
+                except Exception as e:
+                    if not is_throttling_error(e) or attempt >= self.max_retries:
+                        raise
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+            delay = delay * (0.5 + random.random() / 2)
+            print(f"Throttled by translation backend, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})",
+                  file=sys.stderr)
+            time.sleep(delay)
+            attempt += 1
+
+    def map(self, fn, jobs):
+        """
+        Runs fn(*args) for each (tokens, args) job concurrently and returns the
+        results in the same order as `jobs`. A job that fails (including after
+        exhausting throttling retries) yields None in its slot.
+        """
+        if not jobs:
+            return []
+        workers = max(1, min(self.max_workers, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._run_one, fn, tokens, args) for tokens, args in jobs]
+            results = []
+            for idx, f in enumerate(futures):
+                try:
+                    results.append(f.result())
+                except Exception as e:
+                    print(f"Job {idx + 1}/{len(jobs)} failed: {e}", file=sys.stderr)
+                    results.append(None)
+            return results
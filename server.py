@@ -0,0 +1,153 @@
+import argparse
+import base64
+import binascii
+import json
+import os
+import re
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from jobs import JobManager, JobQueueFull
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+DEFAULT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+RETRY_AFTER_SECONDS = 30
+JOB_PATH_RE = re.compile(r"^/jobs/([0-9a-f]{32})(?:/(result|translation))?$")
+
+class TranslationAPIHandler(BaseHTTPRequestHandler):
+    """
+    HTTP job API over the same pipeline as main.py and app.py:
+
+        POST /jobs                    submit a document -> 202 + job status
+        GET  /jobs/<id>               job status and progress
+        GET  /jobs/<id>/result        translated .docx (once done)
+        GET  /jobs/<id>/translation   translated JSON (once done)
+        GET  /health                  queue and worker counts
+
+    POST /jobs takes either the raw .docx bytes (optional ?name=) or JSON
+    {"name": ..., "docx_base64": ..., "glossary": {...}, "context": {...}}.
+    When the queue is full it answers 429 with Retry-After.
+    """
+
+    manager = None
+    max_upload_bytes = DEFAULT_MAX_UPLOAD_BYTES
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, headers=None):
+        self._send_json(status, {"error": message}, headers)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            return self._send_json(200, dict(self.manager.stats(), status="ok"))
+
+        match = JOB_PATH_RE.match(path)
+        job = self.manager.get(match.group(1)) if match else None
+        if job is None:
+            return self._send_error(404, "Job not found")
+        if match.group(2) is None:
+            return self._send_json(200, job.to_dict())
+
+        if job.status == "failed":
+            return self._send_error(409, f"Job failed: {job.error}")
+        if job.status != "done":
+            return self._send_error(409, f"Job is {job.status}", {"Retry-After": "5"})
+        if match.group(2) == "translation":
+            return self._send_json(200, job.translated_data)
+
+        name = os.path.splitext(job.name or "document")[0]
+        self.send_response(200)
+        self.send_header("Content-Type", DOCX_MIME)
+        self.send_header("Content-Length", str(len(job.output_bytes)))
+        self.send_header("Content-Disposition", f'attachment; filename="translated_{name}.docx"')
+        self.end_headers()
+        self.wfile.write(job.output_bytes)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/jobs":
+            return self._send_error(404, "Not found")
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            return self._send_error(400, "Invalid Content-Length header")
+        if length <= 0:
+            return self._send_error(400, "Request body is empty")
+        if length > self.max_upload_bytes:
+            self.close_connection = True
+            return self._send_error(413, f"Upload exceeds {self.max_upload_bytes} bytes")
+        body = self.rfile.read(length)
+
+        name = parse_qs(url.query).get("name", [None])[0]
+        glossary, context_info = None, None
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                payload = json.loads(body)
+                docx_bytes = base64.b64decode(payload["docx_base64"], validate=True)
+            except (ValueError, KeyError, TypeError, binascii.Error) as e:
+                return self._send_error(400, f"Invalid JSON submission: {e}")
+            name = payload.get("name") or name
+            glossary, context_info = payload.get("glossary"), payload.get("context")
+        else:
+            docx_bytes = body
+        if not docx_bytes.startswith(b"PK"):
+            return self._send_error(400, "Body is not a .docx (zip) file")
+
+        try:
+            job = self.manager.submit(docx_bytes, name=name or "document.docx", glossary=glossary,
+                                      context_info=context_info)
+        except JobQueueFull as e:
+            return self._send_error(429, f"Job queue is full ({e}); retry later",
+                                    {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}", file=sys.stderr)
+
+def make_server(host="127.0.0.1", port=8000, manager=None, max_upload_bytes=None):
+    """Builds the HTTP server; each request runs on its own thread, translations on the job pool."""
+    handler = type("Handler", (TranslationAPIHandler,), {
+        "manager": manager or JobManager(),
+        "max_upload_bytes": max_upload_bytes or int(
+            os.environ.get("TRANSLATION_API_MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES)),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP job API for document translation "
+                                                 "(TRANSLATION_BACKEND=stub to run without AWS)")
+    parser.add_argument("--host", default=os.environ.get("TRANSLATION_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("TRANSLATION_API_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Documents translated at once (default: TRANSLATION_JOB_WORKERS)")
+    parser.add_argument("--max-queued", type=int, default=None,
+                        help="Jobs allowed to wait before submissions get 429 (default: TRANSLATION_JOB_QUEUE)")
+    args = parser.parse_args(argv)
+
+    manager = JobManager(max_workers=args.workers, max_queued=args.max_queued)
+    server = make_server(args.host, args.port, manager)
+    print(f"Translation API listening on http://{args.host}:{args.port} "
+          f"({manager.max_workers} workers, queue {manager.max_queued})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown(wait=False)
+
+if __name__ == "__main__":
+    main()
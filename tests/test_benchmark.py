@@ -0,0 +1,19 @@
+from benchmark import compare_to_baseline
+
+def stage(relative, reference_seconds=0.1, rss_growth_mb=30.0):
+    return {"relative": relative, "reference_seconds": reference_seconds, "rss_growth_mb": rss_growth_mb}
+
+BASELINE = {"10000": {"parser.parse_document": stage(3.0)}}
+
+def test_machine_speed_cancels_out():
+    # Twice as slow a machine: seconds double, the ratio to the reference does not
+    assert compare_to_baseline({"10000": {"parser.parse_document": stage(3.1, 0.2)}}, BASELINE, 0.25) == []
+
+def test_relative_slowdown_is_reported():
+    regressions = compare_to_baseline({"10000": {"parser.parse_document": stage(6.0)}}, BASELINE, 0.25)
+    assert len(regressions) == 1 and "relative" in regressions[0]
+
+def test_memory_growth_is_reported_and_short_runs_are_not_timed():
+    results = {"10000": {"parser.parse_document": stage(9.0, reference_seconds=0.01, rss_growth_mb=60.0)}}
+    regressions = compare_to_baseline(results, BASELINE, 0.25)
+    assert len(regressions) == 1 and "rss_growth_mb" in regressions[0]
@@ -0,0 +1,28 @@
+from glossary import GlossaryMatcher, relevant_glossary
+
+def test_overlapping_terms_are_all_found():
+    matcher = GlossaryMatcher(["he", "she", "his", "hers"])
+    assert matcher.find("ushers") == {"he", "she", "hers"}
+
+def test_longest_and_contained_terms_are_both_found():
+    matcher = GlossaryMatcher(["資産", "固定資産", "有形固定資産", "負債"])
+    assert matcher.find("有形固定資産の減損") == {"資産", "固定資産", "有形固定資産"}
+    assert matcher.find("固定負債") == {"負債"}
+
+def test_failure_links_recover_after_a_partial_match():
+    # "売上原" is a dead end for 売上原価率 but its suffix continues into 上原価
+    matcher = GlossaryMatcher(["売上原価率", "上原価"])
+    assert matcher.find("売上原価") == {"上原価"}
+
+def test_no_match_and_empty_inputs():
+    matcher = GlossaryMatcher(["のれん", ""])
+    assert matcher.terms == ["のれん"]
+    assert matcher.find("") == set()
+    assert matcher.find(None) == set()
+    assert matcher.find("のれ") == set()
+
+def test_relevant_glossary_keeps_glossary_order_across_texts():
+    glossary = {"売上高": "Revenue", "営業利益": "Operating profit", "のれん": "Goodwill"}
+    texts = ["のれんの減損", "売上高は増加"]
+    assert list(relevant_glossary(glossary, texts).items()) == [("売上高", "Revenue"), ("のれん", "Goodwill")]
+    assert relevant_glossary({}, texts) == {}
@@ -0,0 +1,39 @@
+from incremental import align_with_previous
+
+def paragraphs(*texts):
+    return [{"id": f"para_{i:03d}", "text": text} for i, text in enumerate(texts)]
+
+def test_unchanged_paragraphs_are_reused_and_new_ones_pending():
+    old = paragraphs("売上高", "営業利益")
+    new = paragraphs("売上高", "経常利益", "営業利益")
+    previous = {"paragraphs": [
+        {"id": "para_000", "text": "売上高", "translated_text": "Revenue"},
+        {"id": "para_001", "text": "営業利益", "translated_text": "Operating profit"},
+    ]}
+    reused, pending = align_with_previous(new, old, previous)
+    assert reused["para_000"]["translated_text"] == "Revenue"
+    assert reused["para_002"]["translated_text"] == "Operating profit"
+    assert reused["para_002"]["id"] == "para_002"
+    assert [p["id"] for p in pending] == ["para_001"]
+
+def test_failed_translations_are_retried():
+    old = paragraphs("売上高", "営業利益")
+    previous = {"paragraphs": [
+        {"id": "para_000", "text": "売上高", "translated_text": "Revenue"},
+        # Fallback of a failed batch: the source text copied through
+        {"id": "para_001", "text": "営業利益", "translated_text": "営業利益"},
+    ]}
+    reused, pending = align_with_previous(old, old, previous)
+    assert list(reused) == ["para_000"]
+    assert [p["id"] for p in pending] == ["para_001"]
+
+def test_items_whose_source_text_no_longer_matches_are_retranslated():
+    # Stored source text that differs from how the previous draft parses now
+    old = paragraphs("第10期", "ヘッダーの枠")
+    previous = {"paragraphs": [
+        {"id": "para_000", "text": "第10期ヘッダーの枠", "translated_text": "10th period header box"},
+        {"id": "para_001", "text": "ヘッダーの枠", "translated_text": "Header box"},
+    ]}
+    reused, pending = align_with_previous(old, old, previous)
+    assert list(reused) == ["para_001"]
+    assert [p["id"] for p in pending] == ["para_000"]
@@ -0,0 +1,146 @@
+import base64
+import http.client
+import io
+import json
+import threading
+import time
+import zipfile
+
+import pytest
+
+import benchmark
+from backends import StubBackend
+from jobs import JobManager, JobQueueFull
+from server import make_server
+
+@pytest.fixture(autouse=True)
+def no_translation_cache(monkeypatch):
+    monkeypatch.setenv("TRANSLATION_CACHE_PATH", "")
+
+def docx(n):
+    """A distinct small document per n (jobs are deduplicated by content)."""
+    return benchmark.synthetic_docx_bytes(n)
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def stub(latency=0.0):
+    return StubBackend(latency=latency, latency_per_paragraph=0)
+
+def test_job_runs_and_duplicate_upload_returns_the_same_job():
+    manager = JobManager(max_workers=1, backend=stub())
+    job = manager.submit(docx(3), name="a.docx")
+    assert manager.submit(docx(3), name="again.docx") is job
+    wait_for(lambda: job.finished)
+    assert job.status == "done", job.error
+    assert job.progress == 1.0
+    assert job.paragraphs_done == job.paragraphs_total == 3
+    texts = [p["translated_text"] for p in job.translated_data["paragraphs"]]
+    assert all(text.startswith("[EN] ") for text in texts)
+    with zipfile.ZipFile(io.BytesIO(job.output_bytes)) as z:
+        assert "[EN] " in z.read("word/document.xml").decode("utf-8")
+    manager.shutdown()
+
+def test_full_queue_raises():
+    manager = JobManager(max_workers=1, max_queued=1, backend=stub(latency=1.0))
+    running = manager.submit(docx(1))
+    wait_for(lambda: running.status == "running")
+    manager.submit(docx(2))
+    with pytest.raises(JobQueueFull):
+        manager.submit(docx(3))
+    assert manager.stats()["queued"] == 1
+    manager.shutdown()
+
+@pytest.fixture
+def api():
+    """Runs the HTTP API on a free port; yields (manager, request function)."""
+    manager = JobManager(max_workers=1, max_queued=1, backend=stub())
+    server = make_server("127.0.0.1", 0, manager, max_upload_bytes=1024 * 1024)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        return response, data
+
+    yield manager, request
+    server.shutdown()
+    server.server_close()
+    manager.shutdown()
+
+def test_submit_poll_and_download(api):
+    manager, request = api
+    response, data = request("POST", "/jobs?name=report.docx", docx(4))
+    assert response.status == 202
+    job = json.loads(data)
+    assert response.getheader("Location") == f"/jobs/{job['id']}"
+
+    # Same content again -> same job
+    response, data = request("POST", "/jobs", docx(4))
+    assert response.status == 202 and json.loads(data)["id"] == job["id"]
+
+    wait_for(lambda: manager.get(job["id"]).finished)
+    response, data = request("GET", f"/jobs/{job['id']}")
+    assert response.status == 200 and json.loads(data)["status"] == "done"
+
+    response, data = request("GET", f"/jobs/{job['id']}/result")
+    assert response.status == 200
+    assert 'filename="translated_report.docx"' in response.getheader("Content-Disposition")
+    assert zipfile.is_zipfile(io.BytesIO(data))
+
+    response, data = request("GET", f"/jobs/{job['id']}/translation")
+    assert response.status == 200
+    assert len(json.loads(data)["paragraphs"]) == 4
+
+def test_json_submission(api):
+    _, request = api
+    body = json.dumps({"name": "b.docx", "docx_base64": base64.b64encode(docx(5)).decode("ascii"),
+                       "glossary": {"当期純利益": "Profit for the year"}})
+    response, data = request("POST", "/jobs", body, {"Content-Type": "application/json"})
+    assert response.status == 202 and json.loads(data)["name"] == "b.docx"
+
+def test_queue_full_answers_429(api):
+    manager, request = api
+    manager.backend.latency = 1.0
+    response, data = request("POST", "/jobs", docx(6))
+    running = json.loads(data)["id"]
+    wait_for(lambda: manager.get(running).status == "running")
+    assert request("POST", "/jobs", docx(7))[0].status == 202
+    response, data = request("POST", "/jobs", docx(8))
+    assert response.status == 429
+    assert response.getheader("Retry-After")
+    # Not finished yet -> 409 for the downloads
+    assert request("GET", f"/jobs/{running}/result")[0].status == 409
+
+@pytest.mark.parametrize("body, headers, status", [
+    (b"not a zip", {}, 400),
+    (b"", {}, 400),
+    (b"{", {"Content-Type": "application/json"}, 400),
+])
+def test_bad_submissions(api, body, headers, status):
+    _, request = api
+    assert request("POST", "/jobs", body, headers)[0].status == status
+
+def test_invalid_content_length_answers_400(api):
+    _, request = api
+    response, _ = request("POST", "/jobs", None, {"Content-Length": "abc"})
+    assert response.status == 400
+
+def test_oversized_upload_answers_413(api):
+    _, request = api
+    # Refused on the declared length, before any of the body is read
+    response, _ = request("POST", "/jobs", None, {"Content-Length": str(2 * 1024 * 1024)})
+    assert response.status == 413
+
+def test_unknown_job_and_health(api):
+    _, request = api
+    assert request("GET", "/jobs/" + "0" * 32)[0].status == 404
+    response, data = request("GET", "/health")
+    assert response.status == 200 and json.loads(data)["status"] == "ok"
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from json_stream import ParagraphStreamParser
+
+ITEMS = [
+    {"id": "para_000", "translated_text": 'He said "revenue {grew}"', "ai_generated_comments": []},
+    {"id": "para_001", "translated_text": "Back\\slash and ] bracket", "ai_generated_comments": ["Check \"term\""]},
+    {"id": "para_002", "translated_text": "日本語 ⟦N1⟧", "ai_generated_comments": [{"nested": {"x": 1}}]},
+]
+REPLY = "```json\n" + json.dumps({"paragraphs": ITEMS}, ensure_ascii=False, indent=2) + "\n```"
+
+def feed_in_chunks(text, size):
+    parser = ParagraphStreamParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 40, len(REPLY)])
+def test_items_split_across_chunk_boundaries(size):
+    assert feed_in_chunks(REPLY, size) == ITEMS
+
+def test_each_item_is_returned_as_soon_as_it_closes():
+    parser = ParagraphStreamParser()
+    # The object's own closing brace, past the braces inside its strings
+    first_end = REPLY.index("}", REPLY.index('"ai_generated_comments": []')) + 1
+    assert parser.feed(REPLY[:first_end - 1]) == []
+    assert parser.feed(REPLY[first_end - 1:first_end]) == [ITEMS[0]]
+
+def test_escaped_quotes_and_braces_inside_strings():
+    text = '{"paragraphs": [{"id": "p", "translated_text": "a \\"}\\" b \\\\"}]}'
+    assert feed_in_chunks(text, 1) == [{"id": "p", "translated_text": 'a "}" b \\'}]
+
+def test_truncated_final_object_is_not_returned():
+    truncated = REPLY[:REPLY.index('"para_002"') + 20]
+    assert feed_in_chunks(truncated, 5) == ITEMS[:2]
+
+def test_text_after_the_array_is_ignored():
+    text = '{"paragraphs": [{"id": "a"}]} {"id": "b"}'
+    assert feed_in_chunks(text, 4) == [{"id": "a"}]
@@ -0,0 +1,56 @@
+import pytest
+
+from numeric import protect_amounts, restore_amounts
+
+def protect(text):
+    protected, amounts = protect_amounts([{"id": "para_000", "text": text}])
+    return protected[0]["text"], amounts.get("para_000", [])
+
+@pytest.mark.parametrize("source, expected", [
+    # REQUIREMENTS.md §4.3 conversion table
+    ("¥1,000", "0.001 million yen"),
+    ("¥1,000,000", "1 million yen"),
+    ("100,000,000円", "100 million yen"),
+    ("1億円", "100 million yen"),
+    ("10億円", "1,000 million yen"),
+    ("1兆円", "1,000,000 million yen"),
+    # Units, mixed scales, full-width digits and negatives
+    ("1,234百万円", "1,234 million yen"),
+    ("500千円", "0.5 million yen"),
+    ("3億5,000万円", "350 million yen"),
+    ("１，０００円", "0.001 million yen"),
+    ("▲1,234百万円", "(1,234) million yen"),
+    ("△2億円", "(200) million yen"),
+    ("▲100", "(100)"),
+])
+def test_conversion(source, expected):
+    text, amounts = protect(source)
+    assert text == "⟦N1⟧"
+    assert amounts == [expected]
+
+@pytest.mark.parametrize("source", [
+    "152.34円",                   # fractional yen (EPS)
+    "50円",                       # below 0.001 million
+    "手数料100円",
+    "¥999",
+    "1株当たり配当金 1,200円",     # per-share amounts stay in yen
+    "1株当たり当期利益は152.34円、配当は50円",
+])
+def test_small_and_per_share_amounts_are_left_in_yen(source):
+    text, amounts = protect(source)
+    assert text == source
+    assert amounts == []
+
+def test_nonzero_amount_never_becomes_zero():
+    _, amounts = protect("1,500円")
+    assert amounts == ["0.002 million yen"]
+
+def test_amounts_before_a_per_share_mention_are_still_converted():
+    text, amounts = protect("純利益1億円、1株当たり50円")
+    assert text == "純利益⟦N1⟧、1株当たり50円"
+    assert amounts == ["100 million yen"]
+
+def test_restore_reports_dropped_placeholders():
+    restored, missing = restore_amounts("Revenue was ⟦N2⟧.", ["1 million yen", "2 million yen"])
+    assert restored == "Revenue was 2 million yen."
+    assert missing == ["1 million yen"]
@@ -0,0 +1,75 @@
+import io
+import zipfile
+
+import pytest
+
+import benchmark
+from parser import iter_paragraphs, parse_document
+from translator import iter_batches, plan_batches
+
+W = benchmark.W_NS
+
+def part_xml(root_tag, body):
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:{root_tag} xmlns:w="{W}">{body}</w:{root_tag}>')
+
+def para(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+def text_box_para(own_text, box_text):
+    """A paragraph anchoring a text box whose content is a paragraph of its own."""
+    return (f'<w:p><w:r><w:t>{own_text}</w:t></w:r><w:r><w:drawing><w:txbxContent>{para(box_text)}'
+            f'</w:txbxContent></w:drawing></w:r></w:p>')
+
+@pytest.fixture(scope="module")
+def story_docx():
+    """Synthetic filing with tables, revisions, comments, text boxes, headers, footers and notes."""
+    source = io.BytesIO(benchmark.synthetic_docx_bytes(60, table_every=10))
+    out = io.BytesIO()
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            data = zin.read(info)
+            if info.filename == "word/document.xml":
+                data = data.decode("utf-8").replace(
+                    "</w:body>", text_box_para("本文の枠", "テキストボックス") + "</w:body>")
+            zout.writestr(info, data)
+        zout.writestr("word/header1.xml", part_xml("hdr", para("株式会社サンプル") + text_box_para("第10期", "ヘッダーの枠")))
+        zout.writestr("word/footer1.xml", part_xml("ftr", para("機密")))
+        zout.writestr("word/footnotes.xml", part_xml(
+            "footnotes", '<w:footnote w:id="1">' + para("注記1：連結範囲") + "</w:footnote>"))
+    return out.getvalue()
+
+def test_iter_paragraphs_yields_exactly_what_parse_document_returns(story_docx):
+    parsed = parse_document(io.BytesIO(story_docx))["paragraphs"]
+    streamed = list(iter_paragraphs(io.BytesIO(story_docx)))
+    assert streamed == parsed
+
+    ids = [record["id"] for record in parsed]
+    assert "header1:para_002" in ids and "footnotes:para_000" in ids and "footer1:para_000" in ids
+    texts = {record["id"]: record["text"] for record in parsed}
+    # Containers hold only their own text; the text box is a record of its own
+    assert texts["header1:para_001"] == "第10期"
+    assert texts["header1:para_002"] == "ヘッダーの枠"
+    assert [t for t in texts.values() if t in ("本文の枠", "テキストボックス")] == ["本文の枠", "テキストボックス"]
+    assert any(record.get("revisions") for record in parsed)
+    assert any(record.get("comments") for record in parsed)
+
+def test_body_only_when_story_parts_are_off(story_docx):
+    parsed = parse_document(io.BytesIO(story_docx), story_parts=False)["paragraphs"]
+    assert parsed == list(iter_paragraphs(io.BytesIO(story_docx), story_parts=False))
+    assert all(":" not in record["id"] for record in parsed)
+
+def test_batches_are_ready_before_parsing_finishes(story_docx):
+    consumed = []
+
+    def tracked():
+        for record in iter_paragraphs(io.BytesIO(story_docx)):
+            consumed.append(record)
+            yield record
+
+    batches = iter_batches(tracked(), max_input_tokens=200)
+    first = next(batches)
+    total = len(parse_document(io.BytesIO(story_docx))["paragraphs"])
+    assert len(consumed) < total
+    assert [first] + list(batches) == plan_batches(list(iter_paragraphs(io.BytesIO(story_docx))),
+                                                   max_input_tokens=200)
@@ -0,0 +1,24 @@
+from translation_cache import LOOKUP_CHUNK, TranslationCache
+
+def test_get_many_returns_hits_and_counts_misses(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many([(f"k{i}", {"translated_text": f"t{i}"}) for i in range(LOOKUP_CHUNK + 10)])
+    keys = [f"k{i}" for i in range(LOOKUP_CHUNK + 10)] + ["missing"]
+    found = cache.get_many(keys)
+    assert len(found) == LOOKUP_CHUNK + 10
+    assert found["k3"] == {"translated_text": "t3"}
+    assert cache.stats()["hits"] == LOOKUP_CHUNK + 10
+    assert cache.stats()["misses"] == 1
+    assert cache.get_many([]) == {}
+    cache.close()
+
+def test_get_many_refreshes_last_access_for_eviction(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many([("old", {"translated_text": "x" * 100})])
+    cache.put_many([("new", {"translated_text": "y" * 100})])
+    cache.get_many(["old"])
+    # Room for one entry: the least recently used ("new") goes
+    cache.max_bytes = 150
+    cache.put_many([("third", {"translated_text": "z"})])
+    assert set(cache.get_many(["old", "new", "third"])) == {"old", "third"}
+    cache.close()
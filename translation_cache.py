@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "word-json", "translations.sqlite3")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Keys per SELECT ... IN, under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+def make_key(text, glossary, context_info, system_prompt, model_id):
+    """
+    Cache key for one paragraph: hash of the source text plus everything else
+    that shapes the model's answer (glossary, context, prompt, model).
+    """
+    payload = json.dumps({
+        "text": text,
+        "glossary": glossary or {},
+        "context": context_info or {},
+        "prompt": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+        "model": model_id,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class TranslationCache:
+    """
+    On-disk SQLite cache of per-paragraph translations with size-based LRU
+    eviction. Safe to share between worker threads.
+    """
+
+    def __init__(self, path=None, max_bytes=None):
+        self.path = os.path.expanduser(path or DEFAULT_CACHE_PATH)
+        self.max_bytes = max_bytes or int(os.environ.get("TRANSLATION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON translations(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Returns the cached item dict for key, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE translations SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def get_many(self, keys):
+        """
+        Returns {key: cached item dict} for the keys found. One transaction for
+        the whole lookup, including the last_access update of every hit.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, value FROM translations WHERE key IN ({placeholders})", chunk).fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE translations SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def put_many(self, items):
+        """Stores (key, item_dict) pairs, then evicts least recently used entries over max_bytes."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, item in items:
+            value = json.dumps(item, ensure_ascii=False)
+            rows.append((key, value, len(value.encode("utf-8")), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, value, size, last_access) VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM translations ORDER BY last_access ASC"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", doomed)
+
+    def stats(self):
+        """Returns hit/miss counters and current on-disk footprint."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM translations").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """
+    Process-wide cache configured from TRANSLATION_CACHE_PATH. Setting the
+    variable to an empty string disables caching (returns None).
+    """
+    global _default_cache
+    path = os.environ.get("TRANSLATION_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = TranslationCache(path)
+            except sqlite3.Error as e:
+                print(f"Translation cache unavailable ({path}): {e}", file=sys.stderr)
+                return None
+        return _default_cache
@@ -1,16 +1,60 @@
+import functools
 import json
 import os
+import re
 import sys
-import boto3
+import time
+import unicodedata
 from dotenv import load_dotenv
+from scheduler import QuotaScheduler, is_throttling_error
+from translation_cache import get_default_cache, make_key
+from numeric import protect_amounts, restore_amounts
+from glossary import relevant_glossary
+from json_stream import ParagraphStreamParser
+from backends import DOCUMENT_MARKER, get_backend
+from metrics import RunMetrics, format_usage
 
 # Load environment variables
 load_dotenv()
 
-def _normalize_translation(input_data, model_output):
+# Bedrock response limit per call; batches are planned to stay under it.
+MAX_OUTPUT_TOKENS = int(os.environ.get("BEDROCK_MAX_TOKENS", 4096))
+# Leave headroom for estimation error so a batch does not hit max_tokens.
+OUTPUT_SAFETY_RATIO = 0.75
+DEFAULT_BATCH_INPUT_TOKENS = 12000
+
+# Rounds of re-requesting paragraphs missing from truncated/failed responses,
+# each with half the previous round's batch budget.
+RECOVERY_ROUNDS = int(os.environ.get("TRANSLATION_RECOVERY_ROUNDS", 2))
+
+# Token estimation heuristics (Claude tokenizer, Japanese source -> English output)
+CJK_TOKENS_PER_CHAR = 1.0
+ASCII_CHARS_PER_TOKEN = 4
+OUTPUT_EXPANSION = 1.3
+PARAGRAPH_OVERHEAD_TOKENS = 30
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Convert amounts locally (numeric.py) and hide them from the model behind placeholders.
+LOCAL_NUMERIC = os.environ.get("TRANSLATION_LOCAL_NUMERIC", "1") != "0"
+
+# Mark the static system prefix (prompt + project context) as a Bedrock prompt-cache checkpoint.
+# Off by default: not every Bedrock model accepts cache_control (the default Claude 3 Opus
+# does not), and a rejected request would leave the whole batch untranslated.
+PROMPT_CACHING = os.environ.get("BEDROCK_PROMPT_CACHING", "0") == "1"
+# Bedrock ignores checkpoints on shorter prefixes, so none is added below this estimate
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Use invoke_model_with_response_stream and emit paragraphs as they complete.
+STREAMING = os.environ.get("BEDROCK_STREAMING", "0") == "1"
+
+def _normalize_translation(input_data, model_output, aliases=None):
     """
     Align model output with required schema, guaranteeing translated_text and
     ai_generated_comments for each input paragraph.
+
+    aliases maps a duplicate paragraph ID to the representative ID that was
+    actually translated (see dedupe_paragraphs); its translation is fanned out.
     """
     paragraphs_in = input_data.get("paragraphs", []) if isinstance(input_data, dict) else []
     output_paras = {}
@@ -27,77 +71,244 @@ def _normalize_translation(input_data, model_output):
         translated_text = base_text
         ai_comments = []
 
-        if pid and pid in output_paras:
-            candidate = output_paras[pid]
+        if pid and pid not in output_paras and aliases and aliases.get(pid) in output_paras:
+            pid_source = aliases[pid]
+        else:
+            pid_source = pid
+
+        if pid_source and pid_source in output_paras:
+            candidate = output_paras[pid_source]
             translated_text = candidate.get("translated_text") or candidate.get("text") or base_text
             ai_comments = candidate.get("ai_generated_comments") or candidate.get("comments") or []
 
-        normalized.append({
+        entry = {
             "id": pid,
             "text": base_text,
             "comments": para.get("comments", []),
             "translated_text": translated_text,
             "ai_generated_comments": ai_comments
-        })
+        }
+        # Carry the source content hash so reconstruction can re-identify the paragraph.
+        if para.get("hash"):
+            entry["hash"] = para["hash"]
+        normalized.append(entry)
 
     return {"paragraphs": normalized}
 
-def get_bedrock_client():
-    """Initializes Bedrock Runtime client."""
-    # Assuming credentials are in env vars or ~/.aws/credentials
-    return boto3.client(
-        service_name='bedrock-runtime', 
-        region_name=os.environ.get("AWS_REGION", "us-east-1")
+def _is_cjk(ch):
+    """True for Japanese/CJK characters, which tokenize at roughly one token per char."""
+    code = ord(ch)
+    return (
+        0x3000 <= code <= 0x30FF      # CJK punctuation, Hiragana, Katakana
+        or 0x3400 <= code <= 0x9FFF   # CJK Unified Ideographs (incl. Ext A)
+        or 0xF900 <= code <= 0xFAFF   # CJK Compatibility Ideographs
+        or 0xFF00 <= code <= 0xFFEF   # Half/full-width forms (￥, ，, full-width digits)
     )
 
-def translate_segments(data, glossary=None, context_info=None):
+def estimate_tokens(text):
+    """Rough token estimate: ~1 token per CJK char, ~4 chars per token otherwise."""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    other = len(text) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + other / ASCII_CHARS_PER_TOKEN) + 1
+
+def estimate_paragraph_tokens(para):
     """
-    Translates the segments using AWS Bedrock (Claude 3).
-    
-    Args:
-        data (dict): The JSON data containing paragraphs.
-        glossary (dict, optional): Dictionary of "Term": "Translation".
-        context_info (dict, optional): Metadata like project_name, member_names, etc.
+    Returns (input_tokens, output_tokens) estimated for a single paragraph.
+    Output assumes the Japanese source expands into English by OUTPUT_EXPANSION,
+    plus the JSON envelope (id, translated_text, ai_generated_comments).
     """
-    client = get_bedrock_client()
-    # Use Opus model by default or from env. Note: Opus ID is 'anthropic.claude-3-opus-20240229-v1:0'
-    model_id = os.environ.get("BEDROCK_MODEL_ID", "anthropic.claude-3-opus-20240229-v1:0")
-    
-    # Load System Prompt from file
+    text_tokens = estimate_tokens(para.get("text", ""))
+    comment_tokens = sum(estimate_tokens(c.get("body", "")) for c in para.get("comments", []) or [])
+    input_tokens = text_tokens + comment_tokens + PARAGRAPH_OVERHEAD_TOKENS
+    output_tokens = int(text_tokens * OUTPUT_EXPANSION) + PARAGRAPH_OVERHEAD_TOKENS
+    return input_tokens, output_tokens
+
+def plan_batches(paragraphs, max_input_tokens=None, max_output_tokens=None):
+    """
+    Splits paragraphs into consecutive batches whose estimated input and output
+    token counts stay within budget. A paragraph that alone exceeds the budget
+    gets a batch of its own rather than being dropped.
+    """
+    return list(iter_batches(paragraphs, max_input_tokens, max_output_tokens))
+
+def iter_batches(paragraphs, max_input_tokens=None, max_output_tokens=None):
+    """
+    Generator form of plan_batches: each batch is yielded as soon as it is full,
+    so batches over parser.iter_paragraphs are ready before parsing finishes.
+    """
+    if max_input_tokens is None:
+        max_input_tokens = int(os.environ.get("TRANSLATION_BATCH_INPUT_TOKENS", DEFAULT_BATCH_INPUT_TOKENS))
+    if max_output_tokens is None:
+        max_output_tokens = int(MAX_OUTPUT_TOKENS * OUTPUT_SAFETY_RATIO)
+
+    current = []
+    current_in = 0
+    current_out = 0
+    for para in paragraphs:
+        p_in, p_out = estimate_paragraph_tokens(para)
+        if current and (current_in + p_in > max_input_tokens or current_out + p_out > max_output_tokens):
+            yield current
+            current = []
+            current_in = 0
+            current_out = 0
+        current.append(para)
+        current_in += p_in
+        current_out += p_out
+    if current:
+        yield current
+
+def _dedupe_key(para):
+    """Paragraphs with the same normalized text, comments and revisions translate identically."""
+    text = WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", para.get("text", ""))).strip()
+    comments = tuple(c.get("body", "") for c in para.get("comments", []) or [])
+    revisions = tuple((r.get("type"), r.get("text")) for r in para.get("revisions", []) or [])
+    return text, comments, revisions
+
+def dedupe_paragraphs(paragraphs):
+    """
+    Collapses paragraphs with identical normalized content (repeated headings,
+    unit lines such as 単位：百万円, note boilerplate) to one representative.
+
+    Returns (unique, aliases, stats): unique keeps the first occurrence of each
+    text in document order, aliases maps every duplicate ID to its
+    representative's ID, and stats reports the duplicates and estimated tokens saved.
+    """
+    unique = []
+    aliases = {}
+    representative = {}
+    saved_tokens = 0
+    for para in paragraphs:
+        key = _dedupe_key(para)
+        if key in representative:
+            aliases[para.get("id")] = representative[key]
+            saved_tokens += sum(estimate_paragraph_tokens(para))
+        else:
+            representative[key] = para.get("id")
+            unique.append(para)
+    stats = {"paragraphs": len(paragraphs), "unique": len(unique),
+             "duplicates": len(aliases), "tokens_saved": saved_tokens}
+    return unique, aliases, stats
+
+@functools.lru_cache(maxsize=1)
+def load_system_prompt():
+    """Loads the IFRS system prompt from disk (once per process), with a minimal fallback."""
     prompt_path = os.path.join(os.path.dirname(__file__), "prompt_ifrs_translation.txt")
     if os.path.exists(prompt_path):
         with open(prompt_path, "r", encoding="utf-8") as f:
-            system_prompt = f.read()
-    else:
-        # Fallback if file missing
-        system_prompt = """You are a professional translator specializing in IFRS documents."""
+            return f.read()
+    # Fallback if file missing
+    return """You are a professional translator specializing in IFRS documents."""
 
-    # Add Context/Glossary to the prompt if provided
+def build_additional_context(glossary=None, context_info=None):
+    """Renders project context and glossary as prompt lines."""
     additional_context = ""
     if context_info:
         additional_context += "\n[Project Context]\n"
         for k, v in context_info.items():
             additional_context += f"- {k}: {v}\n"
-            
+
     if glossary:
         additional_context += "\n[Glossary / Terminology]\n"
         for k, v in glossary.items():
             additional_context += f"- {k} -> {v}\n"
+    return additional_context
+
+@functools.lru_cache(maxsize=32)
+def _system_blocks(context_json):
+    blocks = [{"type": "text", "text": load_system_prompt()}]
+    context_text = build_additional_context(None, json.loads(context_json)).strip()
+    if context_text:
+        blocks.append({"type": "text", "text": context_text})
+    if PROMPT_CACHING and sum(estimate_tokens(block["text"]) for block in blocks) >= PROMPT_CACHE_MIN_TOKENS:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return tuple(blocks)
+
+def build_system_blocks(context_info=None):
+    """
+    The static prompt prefix shared by every batch: the IFRS system prompt and
+    the project context. With BEDROCK_PROMPT_CACHING=1 (for models that support
+    it) and a long enough prefix, it ends in a prompt-cache checkpoint so
+    repeated batch calls reuse it. Built once per process per distinct context.
+    """
+    return list(_system_blocks(json.dumps(context_info or {}, ensure_ascii=False, sort_keys=True)))
+
+def _extract_model_json(result_text):
+    """Pulls the JSON object out of the model's text reply; returns {} on failure."""
+    # Claude might wrap it in ```json ... ``` or just text.
+    start = result_text.find('{')
+    end = result_text.rfind('}') + 1
+    if start == -1 or end == 0:
+        print("Could not find JSON in response", file=sys.stderr)
+        print(result_text, file=sys.stderr)
+        return {}
+    try:
+        return json.loads(result_text[start:end])
+    except json.JSONDecodeError as decode_err:
+        print(f"Failed to decode model JSON: {decode_err}", file=sys.stderr)
+        return {}
+
+def _collect_stream(events, on_paragraph=None):
+    """
+    Reassembles Messages API stream events into the same shape as a
+    non-streaming response body. Each paragraph object is passed to
+    on_paragraph as soon as the incremental parser sees it close.
+    """
+    parser = ParagraphStreamParser()
+    text_parts = []
+    usage = {}
+    stop_reason = None
+    for message in events:
+        kind = message.get('type')
+        if kind == 'message_start':
+            usage.update(message.get('message', {}).get('usage') or {})
+        elif kind == 'content_block_delta':
+            text = message.get('delta', {}).get('text') or ""
+            text_parts.append(text)
+            for item in parser.feed(text):
+                if on_paragraph is not None:
+                    on_paragraph(item)
+        elif kind == 'message_delta':
+            stop_reason = message.get('delta', {}).get('stop_reason') or stop_reason
+            usage.update(message.get('usage') or {})
+
+    return {
+        "content": [{"type": "text", "text": "".join(text_parts)}],
+        "stop_reason": stop_reason,
+        "usage": usage,
+    }
 
+def translate_batch(backend, system, additional_context, batch, on_paragraph=None, stream=False,
+                    metrics=None):
+    """
+    Sends one batch of paragraphs to the backend (Bedrock by default) and
+    returns the raw model JSON (a dict with a "paragraphs" list), or {} if the
+    call or parse failed.
+    Throttling errors are re-raised so the scheduler can back off and retry.
+
+    system is the prompt string or a list of system content blocks (see
+    build_system_blocks).
+    on_paragraph is called with each raw paragraph object: while the response
+    streams in when stream is True, otherwise once the response is parsed.
+    Call latency and token usage are recorded on `metrics` (RunMetrics) if given.
+    """
+    # The content hash is bookkeeping for reconstruction; the model does not need it.
+    payload = [{k: v for k, v in para.items() if k != "hash"} for para in batch]
     user_message = f"""{additional_context}
 
-Here is the document structure to translate:
-{json.dumps(data, ensure_ascii=False)}
+{DOCUMENT_MARKER}
+{json.dumps({"paragraphs": payload}, ensure_ascii=False)}
 
 Translate the 'text' field in each paragraph. Ensure all numeric conversions and IFRS terms are applied correctly.
+Placeholders such as ⟦N1⟧ stand for amounts that have already been converted; copy them unchanged into translated_text.
 """
 
-    # 2. Call Bedrock
     # Claude 3 Messages API format
     body = json.dumps({
         "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 4096,
-        "system": system_prompt,
+        "max_tokens": MAX_OUTPUT_TOKENS,
+        "system": system,
         "messages": [
             {
                 "role": "user",
@@ -108,45 +319,274 @@ Translate the 'text' field in each paragraph. Ensure all numeric conversions and
     })
 
     try:
-        response = client.invoke_model(
-            body=body,
-            modelId=model_id,
-            accept='application/json',
-            contentType='application/json'
-        )
-        
-        response_body = json.loads(response.get('body').read())
+        started = time.perf_counter()
+        if stream:
+            response_body = _collect_stream(backend.invoke_stream(body), on_paragraph)
+        else:
+            response_body = backend.invoke(body)
+        if metrics is not None:
+            metrics.record_batch(time.perf_counter() - started, len(batch), response_body.get('usage'),
+                                 response_body.get('stop_reason'), backend.model_id)
         # Claude 3 response structure
         content_list = response_body.get('content', [])
         if not content_list or not isinstance(content_list, list):
             print("Unexpected Bedrock response: missing content", file=sys.stderr)
-            return _normalize_translation(data, {})
+            return {}
 
         result_text = content_list[0].get('text')
         if not result_text:
             print("Unexpected Bedrock response: empty text payload", file=sys.stderr)
-            return _normalize_translation(data, {})
-        
-        # Parse the JSON from the text response
-        # Claude might wrap it in ```json ... ``` or just text.
-        start = result_text.find('{')
-        end = result_text.rfind('}') + 1
-        if start != -1 and end != -1:
-            json_str = result_text[start:end]
-            try:
-                model_json = json.loads(json_str)
-            except json.JSONDecodeError as decode_err:
-                print(f"Failed to decode model JSON: {decode_err}", file=sys.stderr)
-                return _normalize_translation(data, {})
-            return _normalize_translation(data, model_json)
-        else:
-            print("Could not find JSON in response", file=sys.stderr)
-            print(result_text, file=sys.stderr)
-            return _normalize_translation(data, {})
+            return {}
+
+        truncated = response_body.get('stop_reason') == 'max_tokens'
+        model_json = {} if truncated else _extract_model_json(result_text)
+        if not isinstance(model_json, dict) or not model_json.get("paragraphs"):
+            # Truncated or malformed: keep every paragraph object that did complete
+            salvaged = ParagraphStreamParser().feed(result_text)
+            reason = "truncated at max_tokens" if truncated else "malformed"
+            print(f"Bedrock response {reason}; salvaged {len(salvaged)}/{len(batch)} paragraphs",
+                  file=sys.stderr)
+            model_json = {"paragraphs": salvaged}
+        if on_paragraph is not None and not stream and isinstance(model_json, dict):
+            for item in model_json.get("paragraphs", []):
+                on_paragraph(item)
+        return model_json
 
     except Exception as e:
+        if is_throttling_error(e):
+            raise
         print(f"Bedrock Translation failed: {e}", file=sys.stderr)
-        return _normalize_translation(data, {})
+        return {}
+
+def _restore_numeric(result, source_paragraphs, amounts):
+    """Puts the original text back and swaps numeric placeholders for converted amounts."""
+    source_text = {p.get("id"): p.get("text", "") for p in source_paragraphs}
+    for entry in result.get("paragraphs", []):
+        pid = entry.get("id")
+        if pid not in amounts:
+            continue
+        protected_text = entry.get("text", "")
+        entry["text"] = source_text.get(pid, protected_text)
+        if entry.get("translated_text") == protected_text:
+            # Untranslated fallback: keep the source untouched
+            entry["translated_text"] = entry["text"]
+            continue
+        restored, missing = restore_amounts(entry.get("translated_text", ""), amounts[pid])
+        entry["translated_text"] = restored
+        if missing:
+            entry["ai_generated_comments"] = list(entry.get("ai_generated_comments") or []) + [
+                f"Amounts missing from translation, please verify: {', '.join(missing)}"
+            ]
+    return result
+
+def _paragraph_emitter(on_paragraph, aliases, amounts):
+    """
+    Wraps a caller's on_paragraph callback so it receives finished items for
+    the caller's own paragraph IDs: fanned out to deduplicated copies and with
+    numeric placeholders already restored. Returns None if there is no callback.
+    """
+    if on_paragraph is None:
+        return None
+    copies = {}
+    for dup, rep in aliases.items():
+        copies.setdefault(rep, []).append(dup)
+
+    def emit(item):
+        pid = item.get("id") if isinstance(item, dict) else None
+        if not pid:
+            return
+        for target in [pid] + copies.get(pid, []):
+            translated = item.get("translated_text") or ""
+            if target in amounts:
+                translated, _ = restore_amounts(translated, amounts[target])
+            on_paragraph({
+                "id": target,
+                "translated_text": translated,
+                "ai_generated_comments": item.get("ai_generated_comments") or [],
+            })
+    return emit
+
+def translate_segments(data, glossary=None, context_info=None, scheduler=None, cache=None,
+                       on_paragraph=None, stream=None, backend=None, metrics=None, checkpoint=None):
+    """
+    Translates the segments using AWS Bedrock (Claude 3) or another backend.
+
+    The paragraphs are split into token-budgeted batches (see plan_batches),
+    the batches are dispatched concurrently through a QuotaScheduler that
+    respects requests/tokens-per-minute limits, and the results are merged
+    back by paragraph ID. Amounts are converted locally per REQUIREMENTS.md
+    §4.3 and shown to the model as placeholders. Repeated paragraphs are
+    translated once and fanned out to every copy, and paragraphs already in
+    the translation cache are answered locally and never sent to Bedrock.
+    Each batch's prompt carries only the glossary terms that occur in that batch.
+
+    Args:
+        data (dict): The JSON data containing paragraphs.
+        glossary (dict, optional): Dictionary of "Term": "Translation".
+        context_info (dict, optional): Metadata like project_name, member_names, etc.
+        scheduler (QuotaScheduler, optional): Shared scheduler; one is created from env if omitted.
+        cache (TranslationCache, optional): Defaults to the process-wide cache (see translation_cache).
+        on_paragraph (callable, optional): Called from worker threads with
+            {"id", "translated_text", "ai_generated_comments"} as each paragraph
+            completes, for progress reporting. May repeat an ID if a batch is retried.
+        stream (bool, optional): Stream Bedrock responses so paragraphs are
+            reported while a batch is still generating. Defaults to BEDROCK_STREAMING.
+        backend (TranslationBackend, optional): Model backend; defaults to
+            TRANSLATION_BACKEND (Bedrock unless set to "stub", see backends.py).
+        metrics (RunMetrics, optional): Receives per-batch latency/usage and
+            dedup/cache counters (see metrics.py). Without one, a run-local
+            RunMetrics is used and its token usage printed at the end; a caller
+            that passes one reports it itself.
+        checkpoint (CheckpointJournal, optional): Every batch result is appended to
+            it as soon as it arrives, and paragraphs already in it are not sent again.
+    """
+    if backend is None:
+        backend = get_backend()
+    model_id = backend.model_id
+
+    system_prompt = load_system_prompt()
+
+    source_paragraphs = data.get("paragraphs", []) if isinstance(data, dict) else []
+    amounts = {}
+    if LOCAL_NUMERIC:
+        protected, amounts = protect_amounts(source_paragraphs)
+    else:
+        protected = source_paragraphs
+    protected_data = {"paragraphs": protected}
+
+    paragraphs, aliases, dedupe_stats = dedupe_paragraphs(protected)
+    if aliases:
+        print(f"Dedup: {dedupe_stats['duplicates']} repeated paragraphs collapsed into "
+              f"{dedupe_stats['unique']} unique (~{dedupe_stats['tokens_saved']} tokens saved)", file=sys.stderr)
+    owns_metrics = metrics is None
+    if owns_metrics:
+        metrics = RunMetrics(model_id=model_id)
+    metrics.count("dedupe_duplicates", dedupe_stats["duplicates"], tokens_saved=dedupe_stats["tokens_saved"])
+    emit = _paragraph_emitter(on_paragraph, aliases, amounts)
+    if stream is None:
+        stream = STREAMING
+
+    if cache is None:
+        cache = get_default_cache()
+    merged = []
+    pending = []
+    para_keys = {}
+    resumed = 0
+    if cache is not None or checkpoint is not None:
+        for para in paragraphs:
+            # Only the glossary terms present in the paragraph affect its translation
+            para_glossary = relevant_glossary(glossary, [para.get("text", "")])
+            para_keys[para.get("id")] = make_key(para.get("text", ""), para_glossary, context_info,
+                                                 system_prompt, model_id)
+    journaled = {}
+    if checkpoint is not None:
+        for key in para_keys.values():
+            item = checkpoint.get(key)
+            if item is not None:
+                journaled[key] = item
+    # One lookup for the whole document instead of a query and commit per paragraph
+    cached_items = {}
+    if cache is not None:
+        cached_items = cache.get_many(key for key in para_keys.values() if key not in journaled)
+    for para in paragraphs:
+        key = para_keys.get(para.get("id"))
+        cached = journaled.get(key)
+        if cached is not None:
+            resumed += 1
+        else:
+            cached = cached_items.get(key)
+        if cached is not None:
+            merged.append(dict(cached, id=para.get("id")))
+            if emit is not None:
+                emit(merged[-1])
+        else:
+            pending.append(para)
+    if resumed:
+        print(f"Checkpoint: {resumed} paragraphs already translated, {len(paragraphs) - resumed} left",
+              file=sys.stderr)
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Translation cache: {len(merged) - resumed} hits, {len(pending)} misses "
+              f"(lifetime {stats['hits']}/{stats['hits'] + stats['misses']})", file=sys.stderr)
+    metrics.count("cache_hits", len(merged) - resumed)
+    metrics.count("checkpoint_resumed", resumed)
+    metrics.count("cache_misses", len(pending))
+    if not pending:
+        result = _normalize_translation(protected_data, {"paragraphs": merged}, aliases)
+        return _restore_numeric(result, source_paragraphs, amounts)
+
+    batches = plan_batches(pending)
+
+    if scheduler is None:
+        scheduler = QuotaScheduler()
+    system_blocks = build_system_blocks(context_info)
+    prefix_tokens = sum(estimate_tokens(block["text"]) for block in system_blocks)
+
+    def build_jobs(batches):
+        jobs = []
+        for batch in batches:
+            # Send only the glossary terms that occur in this batch
+            batch_glossary = relevant_glossary(glossary, [p.get("text", "") for p in batch])
+            additional_context = build_additional_context(batch_glossary)
+            context_tokens = prefix_tokens + estimate_tokens(additional_context)
+            batch_in = sum(estimate_paragraph_tokens(p)[0] for p in batch)
+            batch_out = sum(estimate_paragraph_tokens(p)[1] for p in batch)
+            jobs.append((context_tokens + batch_in + batch_out,
+                         (backend, system_blocks, additional_context, batch, emit, stream, metrics)))
+        return jobs
+
+    def run_job(*args):
+        model_json = translate_batch(*args)
+        if checkpoint is not None and isinstance(model_json, dict):
+            checkpoint.record([(para_keys[item.get("id")], item) for item in model_json.get("paragraphs", [])
+                               if isinstance(item, dict) and item.get("id") in para_keys])
+        return model_json
+
+    jobs = build_jobs(batches)
+    print(f"Translating {len(pending)} paragraphs in {len(batches)} batches "
+          f"({scheduler.max_workers} workers)...", file=sys.stderr)
+    if any("cache_control" in block for block in system_blocks) and len(jobs) > 1:
+        # Let the first call write the cached prefix before the rest read it concurrently
+        results = scheduler.map(run_job, jobs[:1]) + scheduler.map(run_job, jobs[1:])
+    else:
+        results = scheduler.map(run_job, jobs)
+
+    # Re-request only what is missing, in progressively smaller batches
+    output_budget = int(MAX_OUTPUT_TOKENS * OUTPUT_SAFETY_RATIO)
+    for round_no in range(1, RECOVERY_ROUNDS + 1):
+        done_ids = {item.get("id") for model_json in results if isinstance(model_json, dict)
+                    for item in model_json.get("paragraphs", []) if isinstance(item, dict)}
+        missing = [p for p in pending if p.get("id") not in done_ids]
+        if not missing:
+            break
+        output_budget = max(output_budget // 2, PARAGRAPH_OVERHEAD_TOKENS)
+        retry_batches = plan_batches(missing, max_output_tokens=output_budget)
+        print(f"Recovery round {round_no}: re-requesting {len(missing)} missing paragraphs "
+              f"in {len(retry_batches)} batches", file=sys.stderr)
+        results = results + scheduler.map(run_job, build_jobs(retry_batches))
+
+    if owns_metrics:
+        print(f"Bedrock usage: {format_usage(metrics.summary())}", file=sys.stderr)
+
+    fresh = []
+    for model_json in results:
+        if isinstance(model_json, dict):
+            fresh.extend(model_json.get("paragraphs", []))
+    merged.extend(fresh)
+
+    if cache is not None:
+        to_store = []
+        for item in fresh:
+            pid = item.get("id") if isinstance(item, dict) else None
+            if pid in para_keys and item.get("translated_text"):
+                to_store.append((para_keys[pid], {
+                    "translated_text": item.get("translated_text"),
+                    "ai_generated_comments": item.get("ai_generated_comments") or [],
+                }))
+        cache.put_many(to_store)
+
+    result = _normalize_translation(protected_data, {"paragraphs": merged}, aliases)
+    return _restore_numeric(result, source_paragraphs, amounts)
 
 if __name__ == "__main__":
     # Test stub